@@ -0,0 +1,125 @@
+# backend/app/answers.py
+#
+# Deterministic answers for result shapes that need no synthesis, so
+# run_query() can skip the response LLM call:
+#
+#   empty        — no rows
+#   scalar       — one row, one column ("The number of orders is 5,000.")
+#   row          — one row, up to ANSWER_MAX_COLUMNS columns
+#   list         — up to ANSWER_LIST_ROWS rows of one or two columns
+#
+# Anything larger, wider or truncated goes to response_sequence as before.
+# Counted in metrics as answer_rendered{shape} / answer_llm; skip_rate()
+# is the share of answers produced locally.
+
+import datetime
+import os
+import re
+from . import metrics
+
+ANSWER_TEMPLATES = os.getenv("ANSWER_TEMPLATES", "1") == "1"
+ANSWER_LIST_ROWS = int(os.getenv("ANSWER_LIST_ROWS", "10"))
+ANSWER_MAX_COLUMNS = int(os.getenv("ANSWER_MAX_COLUMNS", "6"))
+
+_AGGREGATES = {"count": "number", "sum": "total", "avg": "average", "min": "minimum",
+               "max": "maximum", "total": "total"}
+_ABBREVIATIONS = {"avg": "average", "num": "number", "qty": "quantity", "cnt": "count",
+                  "dc": "distribution center", "id": "ID"}
+_TIMESTAMP_RE = re.compile(r"\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?")
+# "how many <noun>" plus, optionally, a be-predicate ("were returned last
+# year"); anything else ("... did women place ...") uses the column label
+_HOW_MANY_RE = re.compile(
+    r"\bhow many\s+([a-z]+(?: [a-z]+)?)"
+    r"(?:\s+(are|is|were|was|have been|has been)\b\s*([^?.!]*?))?\s*[?.!]*\s*$",
+    re.IGNORECASE,
+)
+_EXISTENCE = {"", "there", "there in total", "in total", "there altogether"}
+
+
+def label(column):
+    """Readable name for a result column ('SUM(p.retail_price)' -> 'total retail price')"""
+    m = re.fullmatch(r"\s*(\w+)\s*\(\s*(?:distinct\s+)?([\w.*]+)\s*\)\s*", column, re.IGNORECASE)
+    if m:
+        func, arg = m.group(1).lower(), m.group(2).split(".")[-1]
+        prefix = _AGGREGATES.get(func, func)
+        return prefix if arg == "*" else f"{prefix} {arg.replace('_', ' ')}"
+    words = column.split(".")[-1].replace("_", " ").split()
+    return " ".join(_ABBREVIATIONS.get(w.lower(), w) for w in words)
+
+def value(v):
+    if v is None:
+        return "none"
+    if isinstance(v, bool):
+        return "yes" if v else "no"
+    if isinstance(v, int):
+        return f"{v:,}"
+    if isinstance(v, float):
+        return f"{v:,.0f}" if v.is_integer() else f"{v:,.2f}"
+    if isinstance(v, (datetime.datetime, datetime.date)):
+        return v.strftime("%b %d, %Y")
+    if isinstance(v, str) and _TIMESTAMP_RE.fullmatch(v):
+        # SQLite hands back DateTime columns of raw statements as text
+        return datetime.datetime.fromisoformat(v[:19]).strftime("%b %d, %Y")
+    return str(v)
+
+def _scalar(question, column, v):
+    m = _HOW_MANY_RE.search(question)
+    if m and isinstance(v, (int, float)):
+        noun, verb, rest = m.group(1), m.group(2), (m.group(3) or "").strip()
+        if rest.lower() in _EXISTENCE:
+            return f"The number of {noun} is {value(v)}."
+        if rest.lower().startswith("there "):
+            return f"There {verb.lower()} {value(v)} {noun} {rest[6:]}."
+        # echo the whole predicate so a filtered count doesn't read as a total
+        return f"{value(v)} {noun} {verb.lower()} {rest}."
+    return f"The {label(column)} is {value(v)}."
+
+def _row(columns, row):
+    return "Here's what I found: " + ", ".join(
+        f"{label(c)}: {value(v)}" for c, v in zip(columns, row)
+    ) + "."
+
+def _list(columns, rows):
+    if len(columns) == 1:
+        return f"Here are the {len(rows)} results: " + ", ".join(value(r[0]) for r in rows) + "."
+    head = f"{label(columns[0])} → {label(columns[1])}"
+    return f"Here are the {len(rows)} results ({head}):\n" + "\n".join(
+        f"- {value(a)}: {value(b)}" for a, b in rows
+    )
+
+def shape(qr):
+    """Name of the deterministic shape of a QueryResult, else None"""
+    if qr.row_count == 0:
+        return "empty"
+    if qr.truncated or qr.row_count > len(qr.rows):
+        return None
+    if qr.row_count == 1 and len(qr.columns) == 1:
+        return "scalar"
+    if qr.row_count == 1 and len(qr.columns) <= ANSWER_MAX_COLUMNS:
+        return "row"
+    if qr.row_count <= ANSWER_LIST_ROWS and len(qr.columns) <= 2:
+        return "list"
+    return None
+
+def render(question, qr):
+    """Local answer for a trivially summarizable result, or None to use the LLM"""
+    kind = shape(qr) if ANSWER_TEMPLATES else None
+    if kind is None:
+        metrics.incr("answer_llm")
+        return None
+    if kind == "empty":
+        text = "I couldn't find any matching records."
+    elif kind == "scalar":
+        text = _scalar(question, qr.columns[0], qr.rows[0][0])
+    elif kind == "row":
+        text = _row(qr.columns, qr.rows[0])
+    else:
+        text = _list(qr.columns, qr.rows)
+    metrics.incr("answer_rendered", shape=kind)
+    return text
+
+def skip_rate():
+    """Share of answers rendered without the response LLM call"""
+    rendered = sum(v for (name, _), v in metrics.snapshot().items() if name == "answer_rendered")
+    total = rendered + metrics.get("answer_llm")
+    return rendered / total if total else 0.0
@@ -2,11 +2,15 @@
 
 import os
 import json
-from venv import logger
-from flask import Flask, request, jsonify, abort
+import logging
+import threading
+import time
+from datetime import datetime
+from flask import Flask, Response, request, jsonify, abort, g
 from flask_cors import CORS
 
-from .database import SessionLocal, Base, engine
+from .database import SessionLocal, readonly_engine
+from .init_db import init_db
 from .models import (
     DistributionCenter, Product, InventoryItem,
     Order, OrderItem, User, Conversation, Message
@@ -16,56 +20,167 @@ from .schemas import (
     InventoryItemSchema, OrderSchema, OrderItemSchema,
     UserSchema, ConversationSchema, MessageSchema
 )
-from .crud import get_all, get_by_id, create
-from app.llm_chain import run_query  # Updated import
+from . import answers, batch, http_cache, memory, metrics, notify, tracing
+from .http_cache import response_cache
+from .chat_store import ChatTurn, persist_message, persist_turns, save_turn
+from .crud import (
+    get_by_id, create, get_page_rows, iter_row_tuples,
+    primary_key, parse_filters, coerce_value
+)
+from .serializers import row_encoder
+from app import llm_chain
+from app.llm_chain import run_query, stream_query  # Updated import
+from app.llm_executor import executor as llm_executor
 
-app = Flask(__name__)
-CORS(app)
+logger = logging.getLogger(__name__)
 
-# Ensure tables exist
-Base.metadata.create_all(bind=engine)
+app = Flask(__name__)
+CORS(app, expose_headers=["X-Next-Cursor", "ETag"])
+
+# — Startup —
+# Nothing heavy happens at import: tables are ensured on the first request and
+# the LLM stack is built on the first chat turn. Set EAGER_INIT=1 (e.g. with
+# gunicorn --preload) or run `flask --app app.app warmup` to pay both up front.
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def ensure_schema():
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if not _schema_ready:
+            init_db()
+            _schema_ready = True
+
+@app.before_request
+def _ensure_schema_before_request():
+    ensure_schema()
+
+# — Observability —
+# Request counts/latency per route, per-stage spans (see tracing) and
+# GET /metrics in the Prometheus text format.
+
+@app.before_request
+def _start_timer():
+    g.started = time.perf_counter()
+
+@app.after_request
+def _record_request(response):
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.incr("http_requests", route=route, method=request.method,
+                 status=response.status_code)
+    if "started" in g:
+        metrics.observe("http_request_duration_seconds",
+                        time.perf_counter() - g.started, route=route)
+    return response
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render_prometheus(),
+                    mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+def warmup():
+    """Create tables, open the DB pool and build the LLM chain"""
+    ensure_schema()
+    llm_chain.warmup()
+
+@app.cli.command("init-db")
+def init_db_command():
+    init_db()
+    print("✅ Tables created.")
+
+@app.cli.command("warmup")
+def warmup_command():
+    warmup()
+    print("✅ Warm-up complete.")
+
+if os.getenv("EAGER_INIT") == "1":
+    warmup()
 
 # — Milestones 1–2: Data Endpoints —
 
+# Keyset-paginated on the primary key: ?limit=&after=<last id>&<column>=<value>
+# The next cursor comes back in the X-Next-Cursor header.
+# ?stream=1 switches to NDJSON streamed from a server-side cursor.
+# Pages carry a weak ETag tied to the table's data version (see http_cache):
+# If-None-Match gets a 304, and repeat fetches are served pre-compressed.
+
+DEFAULT_PAGE_SIZE = int(os.getenv("PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "1000"))
+PAGING_ARGS = {"limit", "after", "stream"}
+
+def list_catalog(Model, Schema):
+    args = request.args
+    try:
+        limit = int(args["limit"]) if "limit" in args else None
+        pk = primary_key(Model)
+        after = coerce_value(pk, args["after"]) if "after" in args else None
+        filters = parse_filters(
+            Model, {k: v for k, v in args.items() if k not in PAGING_ARGS}
+        )
+    except ValueError as e:
+        abort(400, description=str(e))
+    if limit is not None and limit < 1:
+        abort(400, description="limit must be positive")
+
+    # Core tuples + a generated encoder (see serializers), same JSON as Schema
+    encoder = row_encoder(Schema, Model)
+    if args.get("stream") in ("1", "true", "ndjson"):
+        def generate():
+            with readonly_engine.connect() as conn:
+                for row in iter_row_tuples(conn, Model, encoder.columns, after, filters,
+                                           limit, batch_size=STREAM_BATCH_SIZE):
+                    yield encoder.dumps_line(row)
+        return Response(generate(), mimetype="application/x-ndjson")
+
+    # Conditional GET + pre-compressed bodies, valid until the next data load
+    tag = http_cache.etag(Model.__tablename__, args, readonly_engine)
+    if request.if_none_match.contains_weak(tag):
+        metrics.incr("http_cache", result="not_modified")
+        return catalog_response(Response(status=304), tag)
+    encoding = http_cache.negotiate(request.headers.get("Accept-Encoding"))
+    entry = response_cache.get(tag, encoding)
+    metrics.incr("http_cache", result="hit" if entry else "miss")
+    if entry is None:
+        limit = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+        with readonly_engine.connect() as conn:
+            rows, next_cursor = get_page_rows(conn, Model, encoder.columns, limit, after, filters)
+        headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor is not None else {}
+        entry = response_cache.put(tag, encoder.dumps(rows), headers, encoding)
+    body, served, headers = entry
+    resp = Response(body, mimetype="application/json", headers=headers)
+    if served != "identity":
+        resp.headers["Content-Encoding"] = served
+    return catalog_response(resp, tag)
+
+def catalog_response(resp, tag):
+    resp.set_etag(tag, weak=True)
+    resp.headers["Cache-Control"] = "no-cache"  # always revalidate, usually a 304
+    resp.vary.add("Accept-Encoding")
+    return resp
+
 @app.route('/api/distribution_centers', methods=['GET'])
 def list_distribution_centers():
-    sess = SessionLocal()
-    items = get_all(sess, DistributionCenter)
-    data = DistributionCenterSchema(many=True).dump(items)
-    sess.close()
-    return jsonify(data), 200
+    return list_catalog(DistributionCenter, DistributionCenterSchema)
 
 @app.route('/api/products', methods=['GET'])
 def list_products():
-    sess = SessionLocal()
-    items = get_all(sess, Product)
-    data = ProductSchema(many=True).dump(items)
-    sess.close()
-    return jsonify(data), 200
+    return list_catalog(Product, ProductSchema)
 
 @app.route('/api/inventory_items', methods=['GET'])
 def list_inventory_items():
-    sess = SessionLocal()
-    items = get_all(sess, InventoryItem)
-    data = InventoryItemSchema(many=True).dump(items)
-    sess.close()
-    return jsonify(data), 200
+    return list_catalog(InventoryItem, InventoryItemSchema)
 
 @app.route('/api/orders', methods=['GET'])
 def list_orders():
-    sess = SessionLocal()
-    items = get_all(sess, Order)
-    data = OrderSchema(many=True).dump(items)
-    sess.close()
-    return jsonify(data), 200
+    return list_catalog(Order, OrderSchema)
 
 @app.route('/api/order_items', methods=['GET'])
 def list_order_items():
-    sess = SessionLocal()
-    items = get_all(sess, OrderItem)
-    data = OrderItemSchema(many=True).dump(items)
-    sess.close()
-    return jsonify(data), 200
+    return list_catalog(OrderItem, OrderItemSchema)
 
 # — Milestone 3: Conversations & Messages —
 
@@ -90,8 +205,9 @@ def create_conversation():
         sess.close()
         abort(404, description="User not found")
     conv = create(sess, Conversation(user_id=uid))
+    data = ConversationSchema().dump(conv)  # before close: messages is lazy
     sess.close()
-    return jsonify(ConversationSchema().dump(conv)), 201
+    return jsonify(data), 201
 
 @app.route('/api/conversations/<int:cid>/messages', methods=['GET'])
 def get_conversation_messages(cid):
@@ -100,7 +216,15 @@ def get_conversation_messages(cid):
     if not conv:
         sess.close()
         abort(404, description="Conversation not found")
-    msgs = conv.messages
+    try:
+        after_id, limit, _ = sync_args()
+    except ValueError as e:
+        sess.close()
+        abort(400, description=str(e))
+    if after_id is None and limit is None:
+        msgs = conv.messages
+    else:
+        msgs = messages_after(sess, cid, after_id or 0, limit)
     data = MessageSchema(many=True).dump(msgs)
     sess.close()
     return jsonify(data), 200
@@ -110,26 +234,20 @@ def post_message(cid):
     data = request.get_json()
     sess = SessionLocal()
     conv = get_by_id(sess, Conversation, cid)
+    sess.close()
     if not conv:
-        sess.close()
         abort(404, description="Conversation not found")
-    msg = create(sess, Message(
-        conversation_id=cid,
-        sender=data.get("sender"),
-        content=data.get("content")
-    ))
-    sess.close()
+    # message + conversation memory in one transaction (see chat_store)
+    msg = persist_message(cid, data.get("sender"), data.get("content"))
     return jsonify(MessageSchema().dump(msg)), 201
 
 # — Milestone 4 & 5: Core Chatbot Endpoint —
 
-@app.route('/api/chat', methods=['POST'])
-def chat():
-    data = request.get_json()
-    
-    # === Log the raw request for debugging ===
-    logger.info(f"Incoming /api/chat request JSON: {data!r}")
-    
+def prepare_chat_turn(data):
+    """Validate the request and build the LLM question in a short read-only
+    session. Nothing is written yet: the user message is staged on the
+    returned ChatTurn and persisted together with the reply. Returns (turn,
+    question, cache_key): a first message is SQL-cached on its own text."""
     user_id = data.get('user_id')
     message = data.get('message')
     conv_id = data.get('conversation_id')
@@ -144,82 +262,309 @@ def chat():
         if not user:
             abort(404, "User not found")
 
-        # Reuse or create conversation
+        # Reuse conversation (a new one is created when the turn is saved)
         if conv_id:
             conversation = get_by_id(sess, Conversation, conv_id)
             if not conversation:
                 abort(404, "Conversation not found")
+            mem = memory.load(sess, conv_id)
         else:
-            conversation = create(sess, Conversation(user_id=user_id))
-
-        conversation_id = conversation.id
-        print("✅ Created or reused conversation:", conversation.id)
-        # Save the user's message
-        user_msg = create(sess, Message(
-            conversation_id=conversation_id,
-            sender="user",
-            content=message
-        ))
-
-        # Build conversation history for context
-        history_messages = (
-            sess.query(Message)
-                .filter(Message.conversation_id == conversation_id)
-                .order_by(Message.timestamp.asc())
-                .all()
-        )
-        history_str = "\n".join(
-            f"{m.sender}: {m.content}" for m in history_messages
-        )
-
-        # Log the history and current message
-        logger.info(f"Conversation #{conversation_id} history:\n{history_str}")
-        logger.info(f"Generating AI reply for message: {message!r}")
-
-        # Generate AI response
-        ai_reply = run_query(
-            f"Conversation history:\n{history_str}\n\nCurrent message: {message}"
-        )
-        logger.info(f"AI replied: {ai_reply!r}")
+            conv_id = None
+            mem = memory.new()
+
+        # Bounded conversation history: running summary + recent window
+        cache_key = message if memory.is_empty(mem) else None
+        memory.append(mem, "user", message)
+        history_str = memory.render(mem)
+        sess.rollback()  # the memory preview is not saved here
+    finally:
+        sess.close()
 
-        # Save the bot's reply
-        bot_msg = create(sess, Message(
-            conversation_id=conversation_id,
-            sender="bot",
-            content=ai_reply
-        ))
+    # Log the history and current message
+    logger.info(f"Conversation #{conv_id} history:\n{history_str}")
+    logger.info(f"Generating AI reply for message: {message!r}")
 
-        sess.commit()
+    turn = ChatTurn(user_id, conv_id, message)
+    return turn, chat_question(history_str, message), cache_key
 
-        return jsonify({
-            "conversation_id": conversation_id,
-            "user_message": message,
-            "ai_response": ai_reply
-        }), 200
+def chat_question(history_str, message):
+    return f"Conversation history:\n{history_str}\n\nCurrent message: {message}"
 
-    except Exception as e:
-        sess.rollback()
-        logger.exception("Error in /api/chat")
-        return jsonify({"error": str(e)}), 500
+@app.route('/api/chat', methods=['POST'])
+def chat():
+    data = request.get_json()
+    
+    # === Log the raw request for debugging ===
+    logger.info(f"Incoming /api/chat request JSON: {data!r}")
 
-    finally:
-        sess.close()
+    with tracing.trace("chat"):
+        with tracing.span("history"):
+            turn, question, cache_key = prepare_chat_turn(data)
+        try:
+            # Generate AI response (no DB connection held meanwhile)
+            ai_reply = run_query(question, turn.user_message, cache_key)
+            logger.info(f"AI replied: {ai_reply!r}")
+
+            # Save user + bot messages in one transaction (or queue them)
+            turn.reply(ai_reply)
+            with tracing.span("persist"):
+                conversation_id = save_turn(turn)
+            tracing.annotate(conversation_id=conversation_id)
+            print("✅ Created or reused conversation:", conversation_id)
+
+            return jsonify({
+                "conversation_id": conversation_id,
+                "user_message": turn.user_message,
+                "ai_response": ai_reply
+            }), 200
+
+        except Exception as e:
+            metrics.incr("errors", stage="chat", type=type(e).__name__)
+            logger.exception("Error in /api/chat")
+            return jsonify({"error": str(e)}), 500
+
+def sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Server-Sent Events variant of /api/chat.
+
+    Emits `conversation`, `sql`, `executed`, one `token` per LLM chunk and a
+    final `answer`; both messages are persisted once the answer is complete.
+    `conversation.conversation_id` is null for a new conversation until the
+    `answer` event carries it.
+    """
+    data = request.get_json()
+    logger.info(f"Incoming /api/chat/stream request JSON: {data!r}")
+
+    with tracing.span("history"):
+        turn, question, cache_key = prepare_chat_turn(data)
+
+    def generate():
+        with tracing.trace("chat_stream"):
+            yield sse("conversation", {
+                "conversation_id": turn.conversation_id,
+                "user_message": turn.user_message,
+            })
+            ai_reply = None
+            for event, payload in stream_query(question, turn.user_message, cache_key):
+                if event == "answer":
+                    ai_reply = payload["text"]
+                else:
+                    yield sse(event, payload)
+
+            try:
+                turn.reply(ai_reply)
+                with tracing.span("persist"):
+                    conversation_id = save_turn(turn)
+                yield sse("answer", {
+                    "conversation_id": conversation_id,
+                    "ai_response": ai_reply,
+                })
+            except Exception as e:
+                metrics.incr("errors", stage="chat_stream", type=type(e).__name__)
+                logger.exception("Error persisting streamed reply")
+                yield sse("error", {"error": str(e)})
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    """Answer many questions in one request.
+
+    Body: {user_id, questions: [...], conversation_id?}. Each question is
+    answered against the conversation's history as it stood before the batch
+    (none for a new conversation); identical questions are answered once and
+    unique ones run concurrently (see batch). All successful turns are saved
+    in one transaction, into the given conversation or one new conversation.
+    Results come back in input order with per-item timings and errors.
+    """
+    data = request.get_json() or {}
+    user_id = data.get('user_id')
+    conv_id = data.get('conversation_id')
+    questions = data.get('questions')
+    if not user_id or not isinstance(questions, list) or not questions:
+        abort(400, "user_id and a non-empty questions list are required")
+    if not all(isinstance(q, str) and q.strip() for q in questions):
+        abort(400, "questions must be non-empty strings")
+    if len(questions) > batch.BATCH_MAX_QUESTIONS:
+        abort(400, f"at most {batch.BATCH_MAX_QUESTIONS} questions per batch")
+
+    started = time.perf_counter()
+    with tracing.trace("chat_batch", questions=len(questions)):
+        with tracing.span("history"):
+            sess = SessionLocal()
+            try:
+                if not get_by_id(sess, User, user_id):
+                    abort(404, "User not found")
+                if conv_id:
+                    if not get_by_id(sess, Conversation, conv_id):
+                        abort(404, "Conversation not found")
+                    mem = memory.load(sess, conv_id)
+                else:
+                    conv_id = None
+                    mem = memory.new()
+                # detached copy: the worker threads never touch the session
+                base = memory.new(conv_id)
+                base.summary, base.window = mem.summary, mem.window
+                fresh = memory.is_empty(base)
+                sess.rollback()
+            finally:
+                sess.close()
+
+        with tracing.span("answers"):
+            results = batch.run(
+                questions,
+                lambda message: chat_question(memory.preview(base, message), message),
+                lambda question, message: run_query(
+                    question, message, message if fresh else None),
+            )
+
+        turns = []
+        for item in results:
+            if item["answer"] is None:
+                continue
+            turn = ChatTurn(user_id, conv_id, item["question"])
+            turn.reply(item["answer"])
+            turns.append(turn)
+        if turns:
+            with tracing.span("persist"):
+                conv_id = persist_turns(turns, share_conversation=True)[0]
+        unique = sum(not r["deduplicated"] for r in results)
+        tracing.annotate(conversation_id=conv_id, unique=unique)
+
+    logger.info(f"Batch of {len(questions)} questions ({unique} unique) "
+                f"for conversation #{conv_id}")
+    return jsonify({
+        "conversation_id": conv_id,
+        "count": len(results),
+        "unique": unique,
+        "errors": sum(r["error"] is not None for r in results),
+        "total_ms": round((time.perf_counter() - started) * 1000, 2),
+        "results": results,
+    }), 200
+
+@app.route('/api/llm/stats')
+def llm_stats():
+    """LLM executor queue depth, wait times, coalescing, template skip rate and
+    SQL/result cache hits, misses and evictions"""
+    return jsonify({**llm_executor.stats(), "answer_skip_rate": answers.skip_rate(),
+                    **llm_chain.cache_stats()})
         
         
+# — Conversation sync —
+# Views keep a cursor instead of refetching history:
+#   /api/conversations?user_id=&after_id=<newest id seen>  (or &since=<ISO>)
+#   /api/messages?conversation_id=&after_id=<last id>[&limit=][&wait=<s>]
+# With wait, an empty result is held open (long-poll, capped at
+# LONG_POLL_SECONDS) until a message lands; /api/conversations/<id>/events
+# pushes the same rows as SSE. Without a cursor the full lists come back.
+
+LONG_POLL_SECONDS = float(os.getenv("LONG_POLL_SECONDS", "25"))
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+def sync_args():
+    """(after_id, limit, wait seconds) from the query string; ValueError if bad"""
+    args = request.args
+    after_id = int(args["after_id"]) if args.get("after_id") else None
+    limit = int(args["limit"]) if args.get("limit") else None
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be positive")
+    if limit is not None:
+        limit = min(limit, MAX_PAGE_SIZE)
+    wait = min(max(float(args.get("wait") or 0), 0), LONG_POLL_SECONDS)
+    return after_id, limit, wait
+
+def messages_after(sess, conversation_id, after_id, limit=None):
+    query = (
+        sess.query(Message)
+        .filter(Message.conversation_id == conversation_id, Message.id > after_id)
+        .order_by(Message.id)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+def message_json(m):
+    return {
+        "id": m.id,
+        "sender": m.sender,
+        "content": m.content,
+        "timestamp": m.timestamp.isoformat()
+    }
+
+def poll_messages(conversation_id, after_id, limit, wait):
+    """Messages past the cursor, waiting up to `wait` seconds for the first one.
+    No session is held while waiting."""
+    deadline = time.monotonic() + wait
+    while True:
+        sess = SessionLocal()
+        try:
+            rows = [message_json(m)
+                    for m in messages_after(sess, conversation_id, after_id, limit)]
+        finally:
+            sess.close()
+        remaining = deadline - time.monotonic()
+        if rows or remaining <= 0:
+            return rows
+        # re-read either way: a writer in another process doesn't publish here
+        notify.wait(conversation_id, after_id, remaining)
+
+@app.route('/api/conversations/<int:cid>/events')
+def conversation_events(cid):
+    """SSE: one `message` event per new message after ?after_id= (or the
+    Last-Event-ID a reconnecting EventSource sends), with comment heartbeats."""
+    sess = SessionLocal()
+    conv = get_by_id(sess, Conversation, cid)
+    sess.close()
+    if not conv:
+        abort(404, description="Conversation not found")
+    try:
+        after_id = int(request.headers.get("Last-Event-ID")
+                       or request.args.get("after_id") or 0)
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    def generate():
+        cursor = after_id
+        while True:
+            rows = poll_messages(cid, cursor, MAX_PAGE_SIZE, SSE_HEARTBEAT_SECONDS)
+            if not rows:
+                yield ": keepalive\n\n"
+                continue
+            for row in rows:
+                cursor = row["id"]
+                yield f"id: {cursor}\n" + sse("message", row)
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
 @app.route('/api/conversations')
 def get_conversations():
     user_id = request.args.get('user_id')
     if not user_id:
         return jsonify({'error': 'user_id required'}), 400
+    try:
+        after_id, _, _ = sync_args()
+        since = request.args.get('since')
+        since = datetime.fromisoformat(since) if since else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     sess = SessionLocal()
     try:
-        conversations = (
-            sess.query(Conversation)
-            .filter_by(user_id=user_id)
-            .order_by(Conversation.started_at.desc())
-            .all()
-        )
+        query = sess.query(Conversation).filter_by(user_id=user_id)
+        if after_id is not None:
+            query = query.filter(Conversation.id > after_id)
+        if since is not None:
+            query = query.filter(Conversation.started_at > since)
+        conversations = query.order_by(Conversation.started_at.desc()).all()
         return jsonify([
             {
                 "id": c.id,
@@ -236,18 +581,19 @@ def get_messages():
     conversation_id = request.args.get('conversation_id')
     if not conversation_id:
         return jsonify({'error': 'conversation_id required'}), 400
+    try:
+        conversation_id = int(conversation_id)
+        after_id, limit, wait = sync_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if after_id is not None or limit is not None or wait:
+        return jsonify(poll_messages(conversation_id, after_id or 0, limit, wait))
 
     sess = SessionLocal()
     try:
         messages = sess.query(Message).filter_by(conversation_id=conversation_id).order_by(Message.timestamp.asc()).all()
-        return jsonify([
-            {
-                "id": m.id,
-                "sender": m.sender,
-                "content": m.content,
-                "timestamp": m.timestamp.isoformat()
-            } for m in messages
-        ])
+        return jsonify([message_json(m) for m in messages])
     finally:
         sess.close()
 
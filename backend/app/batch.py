@@ -0,0 +1,75 @@
+# backend/app/batch.py
+#
+# Fan-out for POST /api/chat/batch.
+#
+# Questions that are identical once whitespace is collapsed are answered once.
+# The unique ones run through llm_chain.run_query on a pool of
+# BATCH_CONCURRENCY threads. Upstream LLM calls are still bounded and
+# rate-limited by llm_executor, so the pool mainly overlaps intents, cache
+# hits, SQL execution and queueing. Each unique question gets its own trace,
+# and its timings, answer path and error come back per item, in input order.
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from . import metrics, tracing
+from .llm_executor import LLM_MAX_CONCURRENCY
+
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", str(LLM_MAX_CONCURRENCY * 2)))
+
+
+def dedupe_key(message):
+    return " ".join(message.split())
+
+def _answer(run_query, question, message):
+    """One unique question in its own trace; returns the item result"""
+    with tracing.trace("chat_batch_item") as t:
+        try:
+            answer = run_query(question, message)
+            error = t.attrs.get("error")
+        except Exception as e:
+            metrics.incr("errors", stage="chat_batch", type=type(e).__name__)
+            answer, error = None, str(e)
+        return {
+            "answer": answer,
+            "error": error,
+            "path": t.attrs.get("path"),
+            "ms": round((time.perf_counter() - t.started) * 1000, 2),
+            "stages": {s["stage"]: s["ms"] for s in t.spans},
+        }
+
+def run(messages, build_question, run_query, concurrency=BATCH_CONCURRENCY):
+    """Answer `messages` (in order), each unique one once.
+
+    build_question(message) gives the prompt text for run_query(question,
+    message). Returns one dict per message: index, question, answer, error,
+    path, ms, stages and deduplicated (True when it reused an earlier answer).
+    """
+    first = {}  # dedupe key -> index of the first message with it
+    order = []
+    for i, message in enumerate(messages):
+        key = dedupe_key(message)
+        if key not in first:
+            first[key] = i
+            order.append(i)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(order)))) as pool:
+        futures = {
+            i: pool.submit(_answer, run_query, build_question(messages[i]), messages[i])
+            for i in order
+        }
+        answered = {i: f.result() for i, f in futures.items()}
+
+    metrics.incr("batch_questions", len(messages))
+    metrics.incr("batch_deduplicated", len(messages) - len(order))
+    results = []
+    for i, message in enumerate(messages):
+        source = first[dedupe_key(message)]
+        results.append({
+            "index": i,
+            "question": message,
+            **answered[source],
+            "deduplicated": source != i,
+        })
+    return results
@@ -0,0 +1,143 @@
+# backend/app/bench_engines.py
+#
+# SQLite vs DuckDB-on-Parquet for the analytical SQL the LLM typically writes.
+# CORPUS pairs a question with the statement the chain produces for it; each
+# statement runs --runs times per engine (no result cache, no governor plan
+# check) and the medians are compared. The results must agree — columns,
+# row count, previewed rows and per-column stats — or the run exits non-zero.
+#
+#   pip install duckdb
+#   python -m app.bench_engines --runs 5 [--export]
+
+import argparse
+import math
+import statistics
+import time
+from sqlalchemy import text
+from . import columnar, data_version, formatter
+from .database import engine, readonly_engine
+
+CORPUS = [
+    ("How many orders are there per status?",
+     "SELECT status, COUNT(*) AS orders FROM orders GROUP BY status ORDER BY orders DESC"),
+    ("What are the 10 best-selling products?",
+     "SELECT p.name, COUNT(*) AS items_sold FROM order_items oi "
+     "JOIN products p ON p.id = oi.product_id "
+     "GROUP BY p.name ORDER BY items_sold DESC, p.name LIMIT 10"),
+    ("What is the revenue per product category?",
+     "SELECT p.category, SUM(p.retail_price) AS revenue FROM order_items oi "
+     "JOIN products p ON p.id = oi.product_id GROUP BY p.category ORDER BY revenue DESC"),
+    ("What is the return rate per department?",
+     "SELECT p.department, AVG(CASE WHEN oi.returned_at IS NOT NULL THEN 1.0 ELSE 0 END) AS rate "
+     "FROM order_items oi JOIN products p ON p.id = oi.product_id GROUP BY p.department"),
+    ("How many items are in stock at each distribution center?",
+     "SELECT dc.name, COUNT(*) AS in_stock FROM inventory_items ii "
+     "JOIN distribution_centers dc ON dc.id = ii.product_distribution_center_id "
+     "WHERE ii.sold_at IS NULL GROUP BY dc.name ORDER BY in_stock DESC"),
+    ("What is the value of unsold inventory per category?",
+     "SELECT product_category, SUM(cost) AS stock_value FROM inventory_items "
+     "WHERE sold_at IS NULL GROUP BY product_category ORDER BY stock_value DESC"),
+    ("Which traffic sources bring the most customers?",
+     "SELECT traffic_source, COUNT(*) AS users FROM users GROUP BY traffic_source ORDER BY users DESC"),
+    ("What is the average number of items per order by gender?",
+     "SELECT gender, AVG(num_of_item) AS avg_items FROM orders GROUP BY gender"),
+    ("How many orders were placed in 2023?",
+     "SELECT COUNT(*) AS orders FROM orders "
+     "WHERE created_at >= '2023-01-01' AND created_at < '2024-01-01'"),
+]
+
+
+def run_sqlite(sql):
+    with readonly_engine.connect() as conn:
+        return formatter.collect(conn.execute(text(sql)))
+
+def run_duckdb(reader, sql):
+    """The statement as columnar.execute runs it (dialect rewrite, SQLite names)"""
+    duck_sql = columnar.to_duckdb(sql)
+    if duck_sql is None:
+        raise ValueError("sent to SQLite for its dialect")
+    names = columnar.sqlite_columns(sql)
+    cursor = reader.cursor()
+    try:
+        cursor.execute(duck_sql)
+        return formatter.collect(columnar._CursorResult(cursor, names))
+    finally:
+        cursor.close()
+
+def _same(a, b):
+    if isinstance(a, float) or isinstance(b, float):
+        return a is not None and b is not None and math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+    return a == b
+
+def differences(sql, expected, got):
+    """Ways the DuckDB result differs from SQLite's (empty when they agree)"""
+    found = []
+    if got.columns != expected.columns:
+        found.append(f"columns {got.columns} != {expected.columns}")
+    if got.row_count != expected.row_count:
+        found.append(f"row count {got.row_count} != {expected.row_count}")
+    ordered = "order by" in sql.lower()
+    complete = expected.row_count == len(expected.rows)
+    if ordered or complete:
+        rows = [got.rows, expected.rows]
+        if not ordered:
+            rows = [sorted(r, key=repr) for r in rows]
+        if len(rows[0]) != len(rows[1]) or not all(
+            _same(a, b) for x, y in zip(*rows) for a, b in zip(x, y)
+        ):
+            found.append("rows differ")
+    for col, s in expected.stats.items():
+        other = got.stats.get(col, {})
+        if any(not _same(other.get(k), v) for k, v in s.items()):
+            found.append(f"stats for {col} differ")
+    return found
+
+def timed(fn, runs):
+    samples = []
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare SQLite and DuckDB on the analytics corpus")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--export", action="store_true", help="export a fresh snapshot first")
+    args = parser.parse_args(argv)
+
+    if not columnar.available():
+        raise SystemExit("duckdb is not installed (pip install duckdb)")
+    data_version.refresh()
+    generation = data_version.generation(engine)
+    reader = None if args.export else columnar.get_reader(generation)
+    if reader is None:
+        started = time.perf_counter()
+        columnar.export_snapshot(engine)
+        print(f"Exported snapshot in {time.perf_counter() - started:.2f}s\n")
+        reader = columnar.get_reader(generation)
+
+    totals = [0.0, 0.0]
+    failed = 0
+    print(f"{'sqlite ms':>10} {'duckdb ms':>10} {'speedup':>8}  question")
+    for question, sql in CORPUS:
+        sqlite_ms, expected = timed(lambda: run_sqlite(sql), args.runs)
+        try:
+            duck_ms, got = timed(lambda: run_duckdb(reader, sql), args.runs)
+        except Exception as e:
+            print(f"{sqlite_ms:10.2f} {'n/a':>10} {'':>8}  {question}  (duckdb: {e})")
+            continue
+        totals[0] += sqlite_ms
+        totals[1] += duck_ms
+        diff = differences(sql, expected, got)
+        failed += bool(diff)
+        note = f"  (RESULTS DIFFER: {'; '.join(diff)})" if diff else ""
+        print(f"{sqlite_ms:10.2f} {duck_ms:10.2f} {sqlite_ms / duck_ms:7.1f}x  {question}{note}")
+    if totals[1]:
+        print(f"{totals[0]:10.2f} {totals[1]:10.2f} {totals[0] / totals[1]:7.1f}x  total")
+    if failed:
+        raise SystemExit(f"{failed} statement(s) returned different results on DuckDB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# backend/app/bench_import.py
+#
+# Cold-start benchmark. Each run is a fresh interpreter that measures:
+#   import   — `import app.app`
+#   first    — first GET /api/distribution_centers (includes table check)
+#   warmup   — llm_chain.warmup() (only with --warmup; needs GROQ_API_KEY)
+# and the slowest modules from one `python -X importtime` run.
+#
+#   python -m app.bench_import --runs 5
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, time
+t0 = time.perf_counter()
+import app.app as a
+t1 = time.perf_counter()
+a.app.test_client().get('/api/distribution_centers?limit=1')
+t2 = time.perf_counter()
+out = {"import": t1 - t0, "first": t2 - t1}
+if WARMUP:
+    a.llm_chain.warmup()
+    out["warmup"] = time.perf_counter() - t2
+print(json.dumps(out))
+"""
+
+
+def run_probe(warmup):
+    code = f"WARMUP = {bool(warmup)}\n" + PROBE
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def slowest_imports(top=10):
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.app"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = [p.strip() for p in line[len("import time:"):].split("|")]
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the Flask app")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup", action="store_true", help="also time llm_chain.warmup()")
+    args = parser.parse_args(argv)
+
+    results = [run_probe(args.warmup) for _ in range(args.runs)]
+    for key in results[0]:
+        values = [r[key] * 1000 for r in results]
+        print(f"{key:>7}: median {statistics.median(values):8.1f} ms   "
+              f"min {min(values):8.1f} ms   max {max(values):8.1f} ms")
+    print("\nSlowest imports (cumulative):")
+    for cumulative, name in slowest_imports():
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+# backend/app/bench_prompts.py
+#
+# Size of the NL→SQL prompt with and without retrieval (see retrieval) on a
+# fixed question set. Prompt tokens use the same ~4 chars/token estimate as
+# memory; "recall" is whether every table and column the reference SQL reads
+# made it into the retrieved schema. The reference queries are not in
+# retrieval.EXAMPLES, so the examples cannot simply be copied.
+#
+#   python -m app.bench_prompts             # prompt tokens + table recall
+#   python -m app.bench_prompts --verify    # run every example/reference SQL
+#   python -m app.bench_prompts --live 3    # also time real SQL generation
+
+import argparse
+import re
+import statistics
+import time
+from sqlalchemy import text
+from . import llm_chain, retrieval, schema_info
+from .database import readonly_engine
+from .memory import estimate_tokens
+
+QUESTIONS = [
+    ("How many orders are still processing?",
+     "SELECT order_count FROM order_status_counts WHERE status = 'Processing'"),
+    ("How many orders did women place in 2022?",
+     "SELECT COUNT(*) FROM orders WHERE gender = 'F' "
+     "AND created_at >= '2022-01-01' AND created_at < '2023-01-01'"),
+    ("Which 3 products earned the most revenue?",
+     "SELECT product_name, SUM(revenue) AS revenue FROM daily_product_sales "
+     "GROUP BY product_id, product_name ORDER BY revenue DESC LIMIT 3"),
+    ("How many Jeans were sold last year?",
+     "SELECT SUM(items_sold) FROM daily_category_sales WHERE category = 'Jeans' "
+     "AND day >= date('now', 'start of year', '-1 year') AND day < date('now', 'start of year')"),
+    ("Which department has the highest return count?",
+     "SELECT department, SUM(items_returned) AS returned FROM daily_category_sales "
+     "GROUP BY department ORDER BY returned DESC LIMIT 1"),
+    ("What is the cheapest product from Levi's?",
+     "SELECT name, retail_price FROM products WHERE brand = 'Levi''s' "
+     "ORDER BY retail_price LIMIT 1"),
+    ("What is the average retail price per department?",
+     "SELECT department, AVG(retail_price) FROM products GROUP BY department"),
+    ("Which distribution center holds the most unsold stock?",
+     "SELECT dc.name, SUM(i.in_stock_items) AS in_stock FROM inventory_by_distribution_center i "
+     "JOIN distribution_centers dc ON dc.id = i.distribution_center_id "
+     "GROUP BY dc.name ORDER BY in_stock DESC LIMIT 1"),
+    ("How many inventory items were created in 2023?",
+     "SELECT COUNT(*) FROM inventory_items "
+     "WHERE created_at >= '2023-01-01' AND created_at < '2024-01-01'"),
+    ("How many customers live in Brasil?",
+     "SELECT COUNT(*) FROM users WHERE country = 'Brasil'"),
+    ("What share of users signed up through Email?",
+     "SELECT AVG(traffic_source = 'Email') FROM users"),
+    ("How many order items were delivered?",
+     "SELECT COUNT(*) FROM order_items WHERE delivered_at IS NOT NULL"),
+    ("Which state has the most customers who ordered more than 3 items?",
+     "SELECT u.state, COUNT(*) AS orders FROM orders o JOIN users u ON u.id = o.user_id "
+     "WHERE o.num_of_item > 3 GROUP BY u.state ORDER BY orders DESC LIMIT 1"),
+    ("What is the name of the product in order item 10?",
+     "SELECT p.name FROM order_items oi JOIN products p ON p.id = oi.product_id WHERE oi.id = 10"),
+]
+
+
+def prompt(question, context):
+    return llm_chain.SQL_TEMPLATE.format(question=question, **context)
+
+def full_context():
+    return {"data_dictionary": llm_chain.DATA_DICTIONARY,
+            "table_info": llm_chain.get_table_info(), "examples": ""}
+
+def tables_read(sql):
+    return {t.lower() for t in retrieval._TABLE_REF.findall(sql)}
+
+def columns_missing(sql, context):
+    """Columns of the retrieved tables the reference SQL uses but the prompt lacks"""
+    words = set(re.findall(r"[a-z_]+", sql.lower()))
+    missing = set()
+    for table, cols in schema_info.get_columns(readonly_engine).items():
+        block = re.search(rf"Table: {table}\nColumns: (.*)", context["table_info"])
+        if block is None:
+            continue
+        for name, _ in cols:
+            if name in words and f"{name} (" not in block.group(1):
+                missing.add(name)
+    return missing
+
+def verify():
+    failures = 0
+    with readonly_engine.connect() as conn:
+        for question, sql in retrieval.EXAMPLES + QUESTIONS:
+            try:
+                conn.execute(text(f"SELECT * FROM ({sql}) LIMIT 1")).fetchall()
+            except Exception as e:
+                failures += 1
+                print(f"FAIL  {question}\n      {e}")
+    total = len(retrieval.EXAMPLES) + len(QUESTIONS)
+    print(f"{total - failures}/{total} statements run")
+    return failures
+
+def live(question, retrieve, runs):
+    """(median ms, last SQL) generating SQL with retrieval on or off"""
+    retrieval.SQL_RETRIEVAL = retrieve
+    sequence = llm_chain.get_sql_sequence()
+    samples, sql = [], None
+    for _ in range(runs):
+        started = time.perf_counter()
+        sql = sequence.invoke({"question": question})
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), llm_chain.clean_sql(sql)
+
+def runs_ok(sql):
+    try:
+        with readonly_engine.connect() as conn:
+            conn.execute(text(f"SELECT * FROM ({sql}) LIMIT 1")).fetchall()
+        return True
+    except Exception:
+        return False
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure NL→SQL prompt size with retrieval")
+    parser.add_argument("--verify", action="store_true",
+                        help="execute every example and reference statement")
+    parser.add_argument("--live", type=int, default=0, metavar="RUNS",
+                        help="also generate SQL with the configured LLM, RUNS times per mode")
+    args = parser.parse_args(argv)
+
+    if args.verify:
+        raise SystemExit(1 if verify() else 0)
+
+    enabled = retrieval.SQL_RETRIEVAL
+    full_tokens = estimate_tokens(prompt("", full_context()))
+    header = f"{'full':>6} {'retr':>6} {'ms':>6} {'recall':>6}"
+    if args.live:
+        header += f" {'full ms':>8} {'retr ms':>8} {'runs':>5}"
+    print(f"{header}  question")
+    totals = {"full": 0, "retr": 0, "hits": 0, "full_ms": [], "retr_ms": [],
+              "full_ok": 0, "retr_ok": 0}
+    for question, reference in QUESTIONS:
+        retrieval.SQL_RETRIEVAL = True
+        started = time.perf_counter()
+        context = llm_chain.sql_context(question)
+        retrieve_ms = (time.perf_counter() - started) * 1000
+        full = estimate_tokens(prompt(question, full_context()))
+        retr = estimate_tokens(prompt(question, context))
+        hit = tables_read(reference) <= {
+            t for t in tables_read(reference) if f"Table: {t}\n" in context["table_info"]
+        }
+        totals["full"] += full
+        totals["retr"] += retr
+        missing = columns_missing(reference, context)
+        hit = hit and not missing
+        totals["hits"] += hit
+        line = f"{full:6d} {retr:6d} {retrieve_ms:6.2f} {'yes' if hit else 'NO':>6}"
+        if args.live:
+            full_ms, full_sql = live(question, False, args.live)
+            retr_ms, retr_sql = live(question, True, args.live)
+            full_ok, retr_ok = runs_ok(full_sql), runs_ok(retr_sql)
+            totals["full_ms"].append(full_ms)
+            totals["retr_ms"].append(retr_ms)
+            totals["full_ok"] += full_ok
+            totals["retr_ok"] += retr_ok
+            line += f" {full_ms:8.0f} {retr_ms:8.0f} {int(full_ok)}/{int(retr_ok):<3}"
+        note = f"  (missing {', '.join(sorted(missing))})" if missing else ""
+        print(f"{line}  {question}{note}")
+    retrieval.SQL_RETRIEVAL = enabled
+
+    n = len(QUESTIONS)
+    print(f"\nfull prompt without a question: ~{full_tokens} tokens")
+    print(f"mean prompt tokens: {totals['full'] / n:.0f} -> {totals['retr'] / n:.0f} "
+          f"({1 - totals['retr'] / totals['full']:.0%} fewer)")
+    print(f"schema recall: {totals['hits']}/{n}")
+    if args.live:
+        print(f"median SQL latency: {statistics.median(totals['full_ms']):.0f} ms -> "
+              f"{statistics.median(totals['retr_ms']):.0f} ms")
+        print(f"generated SQL that runs: {totals['full_ok']}/{n} -> {totals['retr_ok']}/{n}")
+
+if __name__ == '__main__':
+    main()
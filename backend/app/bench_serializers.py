@@ -0,0 +1,72 @@
+# backend/app/bench_serializers.py
+#
+# Catalog list serialization: the marshmallow path (ORM objects ->
+# Schema.dump(many=True) -> json) against the fast path (Core tuples ->
+# generated row encoder -> orjson). Both produce the same JSON, which is
+# checked before timing.
+#
+#   python -m app.bench_serializers --rows 1000 --runs 20
+
+import argparse
+import json
+import statistics
+import time
+from .crud import get_page_rows, primary_key
+from .database import SessionLocal, readonly_engine
+from .models import DistributionCenter, InventoryItem, Order, OrderItem, Product
+from .schemas import (
+    DistributionCenterSchema, InventoryItemSchema, OrderItemSchema, OrderSchema, ProductSchema
+)
+from .serializers import row_encoder
+
+CATALOG = [
+    (DistributionCenter, DistributionCenterSchema),
+    (Product, ProductSchema),
+    (InventoryItem, InventoryItemSchema),
+    (Order, OrderSchema),
+    (OrderItem, OrderItemSchema),
+]
+
+
+def marshmallow_page(Model, Schema, rows):
+    sess = SessionLocal()
+    try:
+        objs = sess.query(Model).order_by(primary_key(Model)).limit(rows).all()
+        return json.dumps(Schema().dump(objs, many=True)).encode()
+    finally:
+        sess.close()
+
+def fast_page(Model, Schema, rows):
+    encoder = row_encoder(Schema, Model)
+    with readonly_engine.connect() as conn:
+        tuples, _ = get_page_rows(conn, Model, encoder.columns, rows)
+    return encoder.dumps(tuples)
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare catalog serialization paths")
+    parser.add_argument("--rows", type=int, default=1000, help="rows per page")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    print(f"{'table':<22}{'rows':>6}{'marshmallow ms':>16}{'fast ms':>10}{'speedup':>9}")
+    for Model, Schema in CATALOG:
+        old = marshmallow_page(Model, Schema, args.rows)
+        new = fast_page(Model, Schema, args.rows)
+        if json.loads(old) != json.loads(new):
+            raise SystemExit(f"{Model.__tablename__}: outputs differ")
+        count = len(json.loads(new))
+        slow_ms = timed(lambda: marshmallow_page(Model, Schema, args.rows), args.runs)
+        fast_ms = timed(lambda: fast_page(Model, Schema, args.rows), args.runs)
+        print(f"{Model.__tablename__:<22}{count:>6}{slow_ms:>16.2f}{fast_ms:>10.2f}"
+              f"{slow_ms / fast_ms:>8.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+# backend/app/chat_store.py
+#
+# Write path for chat turns. A turn (optional new conversation, user message,
+# bot message, memory update) is written in ONE transaction after the LLM has
+# answered, so no connection is held during LLM latency. Messages posted
+# directly (persist_message) update the conversation memory the same way, so
+# the prompt history never misses them.
+#
+# Both read the memory row, append to it and write it back, so each write
+# transaction takes SQLite's write lock before reading (BEGIN IMMEDIATE):
+# writers for the same conversation are serialized, and a concurrent first
+# turn finds the memory row the other one created instead of inserting its own.
+#
+# With WRITE_BEHIND=1, turns for existing conversations are queued and a
+# background thread persists them in batches (up to WRITE_BEHIND_BATCH turns
+# per transaction, waiting at most WRITE_BEHIND_FLUSH_MS to fill a batch).
+# The queue is drained on interpreter exit.
+
+import atexit
+import datetime
+import logging
+import os
+import queue
+import threading
+import time
+from sqlalchemy import text
+from .database import SessionLocal
+from .models import Conversation, Message
+from . import memory, metrics, notify
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "0") == "1"
+WRITE_BEHIND_BATCH = int(os.getenv("WRITE_BEHIND_BATCH", "100"))
+WRITE_BEHIND_FLUSH_MS = int(os.getenv("WRITE_BEHIND_FLUSH_MS", "20"))
+
+
+class ChatTurn:
+    """One user message and its reply, staged until the reply is known"""
+
+    def __init__(self, user_id, conversation_id, user_message, received_at=None):
+        self.user_id = user_id
+        self.conversation_id = conversation_id
+        self.user_message = user_message
+        self.received_at = received_at or datetime.datetime.utcnow()
+        self.bot_reply = None
+        self.replied_at = None
+
+    def reply(self, text):
+        self.bot_reply = text
+        self.replied_at = datetime.datetime.utcnow()
+
+
+def _begin_write(sess):
+    """Start the transaction holding the write lock (see the module comment)"""
+    if sess.get_bind().dialect.name == "sqlite":
+        sess.execute(text("BEGIN IMMEDIATE"))
+
+def _stage(sess, turn):
+    if turn.conversation_id is None:
+        conversation = Conversation(user_id=turn.user_id, started_at=turn.received_at)
+        sess.add(conversation)
+        sess.flush()
+        turn.conversation_id = conversation.id
+    # memory first: bootstrapping it reads the conversation's earlier messages
+    mem = memory.load(sess, turn.conversation_id)
+    memory.append(mem, "user", turn.user_message)
+    memory.append(mem, "bot", turn.bot_reply)
+    sess.add(Message(
+        conversation_id=turn.conversation_id, sender="user",
+        content=turn.user_message, timestamp=turn.received_at,
+    ))
+    bot_message = Message(
+        conversation_id=turn.conversation_id, sender="bot",
+        content=turn.bot_reply, timestamp=turn.replied_at,
+    )
+    sess.add(bot_message)
+    sess.flush()
+    return bot_message.id
+
+def persist_message(conversation_id, sender, content):
+    """Write one message and fold it into the conversation memory together"""
+    sess = SessionLocal()
+    try:
+        _begin_write(sess)
+        # memory first: bootstrapping it reads the conversation's earlier messages
+        mem = memory.load(sess, conversation_id)
+        memory.append(mem, sender, content)
+        message = Message(conversation_id=conversation_id, sender=sender, content=content)
+        sess.add(message)
+        sess.commit()
+        sess.refresh(message)
+        notify.publish(conversation_id, message.id)
+        return message
+    except Exception:
+        sess.rollback()
+        raise
+    finally:
+        sess.close()
+
+def persist_turns(turns, share_conversation=False):
+    """Write all turns in a single transaction; returns their conversation ids.
+
+    With share_conversation, a turn without a conversation joins the one the
+    turn before it was written to (so a batch starts at most one).
+    """
+    sess = SessionLocal()
+    try:
+        _begin_write(sess)
+        last_ids = []
+        for previous, turn in zip([None, *turns], turns):
+            if share_conversation and turn.conversation_id is None and previous is not None:
+                turn.conversation_id = previous.conversation_id
+            last_ids.append(_stage(sess, turn))
+        sess.commit()
+        for turn, message_id in zip(turns, last_ids):
+            notify.publish(turn.conversation_id, message_id)
+        return [turn.conversation_id for turn in turns]
+    except Exception:
+        sess.rollback()
+        raise
+    finally:
+        sess.close()
+
+
+class WriteBehindQueue:
+    """Background writer grouping many turns into one transaction"""
+
+    def __init__(self, batch_size=WRITE_BEHIND_BATCH, flush_ms=WRITE_BEHIND_FLUSH_MS):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = self.turns = self.errors = 0
+
+    def submit(self, turn):
+        self._start()
+        self._queue.put(turn)
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="chat-write-behind", daemon=True
+                )
+                self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=max(remaining, 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        try:
+            persist_turns(batch)
+        except Exception:
+            # one bad turn must not drop the rest of the batch
+            logger.exception("Write-behind batch failed; retrying turns one by one")
+            for turn in batch:
+                try:
+                    persist_turns([turn])
+                except Exception:
+                    self.errors += 1
+                    logger.exception("Dropping chat turn for conversation %s",
+                                     turn.conversation_id)
+        self.batches += 1
+        self.turns += len(batch)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def flush(self):
+        """Block until everything submitted so far is written"""
+        if self._thread is not None:
+            self._queue.join()
+
+
+write_behind = WriteBehindQueue()
+atexit.register(write_behind.flush)
+metrics.register_gauge("write_behind_depth", write_behind.depth)
+
+def save_turn(turn):
+    """Persist a completed turn now, or queue it when write-behind is on.
+
+    New conversations are always written synchronously so the caller gets
+    their id back. Returns the conversation id.
+    """
+    if WRITE_BEHIND and turn.conversation_id is not None:
+        write_behind.submit(turn)
+        return turn.conversation_id
+    return persist_turns([turn])[0]
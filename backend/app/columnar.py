@@ -0,0 +1,331 @@
+# backend/app/columnar.py
+#
+# Optional columnar engine for the LLM's read-only analytical SQL.
+#
+# export_snapshot() writes every table in schema_info.ANALYTICS_TABLES to
+# SNAPSHOT_DIR/<table>.parquet, plus a manifest with the data generation
+# (see data_version) the snapshot was read at. load_data calls it after each
+# load when ANALYTICS_ENGINE=duckdb. Tables are streamed in
+# SNAPSHOT_CHUNK_ROWS chunks into an on-disk DuckDB staging file (which
+# spills instead of growing in memory) and copied to Parquet from there, so
+# peak memory does not scale with table size.
+#
+# With ANALYTICS_ENGINE=duckdb, execute() runs statements on an in-process
+# DuckDB over those files (vectorized, column-pruned scans). It returns None,
+# and the caller runs the statement on SQLite as before, when duckdb is not
+# installed, the snapshot is missing or older than the current generation, or
+# DuckDB cannot run the (SQLite-dialect) statement.
+#
+# The statements are written for SQLite, so DuckDB is set up to answer them
+# the same way: integer division, SQLite's NULL ordering, LIKE rewritten to
+# ILIKE (SQLite's LIKE ignores ASCII case), result columns named as SQLite
+# names them, and timestamps/decimals returned as SQLite returns them.
+# Constructs that would still silently differ (CAST, date functions, GLOB,
+# scalar min/max, ...) are sent to SQLite (see SQLITE_ONLY_RE).
+#
+#   pip install duckdb
+#   python -m app.columnar          # export a snapshot now
+
+import datetime
+import json
+import logging
+import os
+import re
+import threading
+import time
+from sqlalchemy import Boolean, Date, DateTime, Integer, Numeric, func, select, text
+from . import formatter, governor, metrics, schema_info, tracing
+from .database import Base, readonly_engine
+from .models import DataVersion
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ANALYTICS_ENGINE = os.getenv("ANALYTICS_ENGINE", "sqlite")  # or "duckdb"
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(BASE_DIR, "../snapshot"))
+DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", "0"))  # 0 = one per core
+SNAPSHOT_CHUNK_ROWS = int(os.getenv("SNAPSHOT_CHUNK_ROWS", "50000"))
+MANIFEST = "manifest.json"
+STAGING = ".export.duckdb"
+
+# checked in order (DateTime before anything it could be mistaken for)
+_DUCKDB_TYPES = [(DateTime, "TIMESTAMP"), (Date, "DATE"), (Boolean, "BOOLEAN"),
+                 (Integer, "BIGINT"), (Numeric, "DOUBLE")]
+
+# Constructs DuckDB accepts but evaluates differently from SQLite: CAST
+# rounds (SQLite truncates) and REAL is 32-bit, strftime and the date
+# functions take other arguments, min/max(a, b) return lists
+SQLITE_ONLY_RE = re.compile(
+    r"\b(?:cast|strftime|julianday|unixepoch|date|time|datetime|typeof|printf|instr)\s*\("
+    r"|\b(?:min|max)\s*\([^()]*,|\bglob\b|\bregexp\b|\bcollate\b",
+    re.IGNORECASE,
+)
+# string literals and quoted identifiers are copied through untouched
+_LIKE_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\blike\b", re.IGNORECASE)
+
+_lock = threading.Lock()
+_reader = None
+
+
+def enabled():
+    return ANALYTICS_ENGINE == "duckdb"
+
+def available():
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# — Export —
+
+def _date_columns(table):
+    return [c.name for c in Base.metadata.tables[table].c
+            if isinstance(c.type, (Date, DateTime))]
+
+def _duckdb_type(sql_type):
+    for sql_class, name in _DUCKDB_TYPES:
+        if isinstance(sql_type, sql_class):
+            return name
+    return "VARCHAR"
+
+def _export_table(db, conn, table, path):
+    """Stream one table into the staging database, then COPY it to Parquet"""
+    import pandas as pd
+
+    columns = list(Base.metadata.tables[table].c)
+    names = ", ".join(f'"{c.name}"' for c in columns)
+    db.execute(f'CREATE OR REPLACE TABLE "{table}" (' + ", ".join(
+        f'"{c.name}" {_duckdb_type(c.type)}' for c in columns) + ")")
+    rows = 0
+    chunks = pd.read_sql_query(
+        text(f"SELECT {names} FROM {table}"), conn,
+        parse_dates=_date_columns(table), chunksize=SNAPSHOT_CHUNK_ROWS,
+    )
+    for chunk in chunks:
+        db.register("chunk", chunk)
+        db.execute(f'INSERT INTO "{table}" SELECT * FROM chunk')
+        db.unregister("chunk")
+        rows += len(chunk)
+    db.execute(f"COPY \"{table}\" TO '{path}.tmp' (FORMAT PARQUET, COMPRESSION ZSTD)")
+    db.execute(f'DROP TABLE "{table}"')
+    os.replace(f"{path}.tmp", path)
+    return rows
+
+def export_snapshot(engine, tables=None, snapshot_dir=None):
+    """Write each table to Parquet from one read transaction; returns {table: rows}"""
+    import duckdb
+
+    snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+    tables = [t for t in (tables or schema_info.ANALYTICS_TABLES)
+              if t in Base.metadata.tables]
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    written = {}
+    staging = os.path.join(snapshot_dir, STAGING)
+    for leftover in (staging, f"{staging}.wal"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    db = duckdb.connect(staging)
+    try:
+        with engine.connect() as conn:
+            # every read below shares this transaction, so files and
+            # generation describe the same committed state
+            generation = conn.execute(
+                select(func.coalesce(func.sum(DataVersion.version), 0))
+            ).scalar()
+            for table in tables:
+                path = os.path.join(snapshot_dir, f"{table}.parquet")
+                written[table] = _export_table(db, conn, table, path)
+    finally:
+        db.close()
+        for leftover in (staging, f"{staging}.wal"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    manifest = {
+        "generation": generation,
+        "tables": written,
+        "created_at": datetime.datetime.utcnow().isoformat(),
+    }
+    with open(os.path.join(snapshot_dir, f"{MANIFEST}.tmp"), "w") as f:
+        json.dump(manifest, f)
+    os.replace(os.path.join(snapshot_dir, f"{MANIFEST}.tmp"),
+               os.path.join(snapshot_dir, MANIFEST))
+    reset()
+    return written
+
+
+# — Query —
+
+class SnapshotReader:
+    """In-memory DuckDB database with one view per exported Parquet file"""
+
+    def __init__(self, snapshot_dir):
+        import duckdb
+
+        with open(os.path.join(snapshot_dir, MANIFEST)) as f:
+            manifest = json.load(f)
+        self.generation = manifest["generation"]
+        self.tables = list(manifest["tables"])
+        self._db = duckdb.connect(config={
+            "integer_division": True,
+            "default_null_order": "nulls_first_on_asc_last_on_desc",
+        })
+        if DUCKDB_THREADS:
+            self._db.execute(f"SET threads = {DUCKDB_THREADS}")
+        for table in self.tables:
+            path = os.path.join(snapshot_dir, f"{table}.parquet")
+            self._db.execute(
+                f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{path}')"
+            )
+
+    def cursor(self):
+        # one connection per statement; cursors share the catalog and are thread-safe
+        return self._db.cursor()
+
+    def close(self):
+        self._db.close()
+
+
+def _sqlite_value(type_name):
+    """Converter giving a DuckDB value the form SQLite returns it in, or None"""
+    if type_name.startswith("TIMESTAMP"):
+        return lambda v: None if v is None else v.isoformat(" ", "microseconds")
+    if type_name == "DATE":
+        return lambda v: None if v is None else v.isoformat()
+    if type_name.startswith("DECIMAL"):
+        return lambda v: None if v is None else float(v)
+    return None
+
+
+class _CursorResult:
+    """The slice of the SQLAlchemy Result API that formatter.collect() uses.
+
+    `names` replaces DuckDB's column names; values are converted to the
+    types SQLite would have returned.
+    """
+
+    def __init__(self, cursor, names=None):
+        self._cursor = cursor
+        self._names = names
+        self._converters = [
+            (i, convert) for i, d in enumerate(cursor.description)
+            if (convert := _sqlite_value(str(d[1]))) is not None
+        ]
+
+    def keys(self):
+        return self._names or [d[0] for d in self._cursor.description]
+
+    def fetchmany(self, size):
+        rows = self._cursor.fetchmany(size)
+        if not self._converters:
+            return rows
+        converted = []
+        for row in rows:
+            row = list(row)
+            for i, convert in self._converters:
+                row[i] = convert(row[i])
+            converted.append(row)
+        return converted
+
+
+def get_reader(generation, snapshot_dir=None):
+    """Reader for a snapshot taken at `generation`, else None"""
+    global _reader
+    snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+    with _lock:
+        if _reader is not None and _reader.generation == generation:
+            return _reader
+        if not os.path.exists(os.path.join(snapshot_dir, MANIFEST)):
+            return None
+        reader = SnapshotReader(snapshot_dir)
+        if reader.generation != generation:
+            reader.close()
+            metrics.incr("columnar_stale")
+            return None
+        if _reader is not None:
+            _reader.close()
+        _reader = reader
+        return _reader
+
+def reset():
+    """Close the open reader so the next query picks up a new snapshot"""
+    global _reader
+    with _lock:
+        if _reader is not None:
+            _reader.close()
+        _reader = None
+
+def to_duckdb(sql):
+    """The statement in DuckDB's dialect, or None when only SQLite can run it"""
+    sql = governor.strip_comments(sql)
+    if SQLITE_ONLY_RE.search(sql):
+        return None
+    return _LIKE_RE.sub(lambda m: "ILIKE" if m.group(0)[0] not in "'\"" else m.group(0), sql)
+
+def sqlite_columns(sql):
+    """Result column names SQLite gives the statement (it is not run)"""
+    with readonly_engine.connect() as conn:
+        keys = conn.exec_driver_sql(
+            f"SELECT * FROM ({governor.strip_comments(sql)}) LIMIT 0"
+        ).keys()
+    # the subquery renames a repeated name to "name:1"; the statement would not
+    return [re.sub(r":\d+$", "", name) for name in keys]
+
+def execute(sql, generation, max_rows=None, seconds=None):
+    """QueryResult from the columnar snapshot, or None to fall back to SQLite"""
+    if not enabled() or not available():
+        return None
+    import duckdb
+
+    reader = get_reader(generation)
+    if reader is None:
+        return None
+    duck_sql = to_duckdb(sql)
+    if duck_sql is None:
+        metrics.incr("columnar_fallback", reason="dialect")
+        return None
+    try:
+        names = sqlite_columns(sql)
+    except Exception:
+        return None  # SQLite reports the error when it runs the statement
+    seconds = governor.QUERY_TIMEOUT_SECONDS if seconds is None else seconds
+    cursor = reader.cursor()
+    timer = threading.Timer(seconds, cursor.interrupt) if seconds > 0 else None
+    started = time.perf_counter()
+    try:
+        if timer:
+            timer.start()
+        cursor.execute(duck_sql)
+        if len(cursor.description) != len(names):
+            metrics.incr("columnar_fallback", reason="columns")
+            return None
+        qr = formatter.collect(_CursorResult(cursor, names), max_rows,
+                               cap=governor.MAX_RESULT_ROWS)
+    except duckdb.InterruptException as e:
+        metrics.incr("governor_interrupted")
+        raise governor.QueryTimeout(
+            "That query took too long to run. Could you ask something more specific?"
+        ) from e
+    except duckdb.Error as e:
+        logger.info(f"DuckDB could not run the statement, using SQLite: {e}")
+        metrics.incr("columnar_fallback", reason="error")
+        return None
+    finally:
+        if timer:
+            timer.cancel()
+        cursor.close()
+    metrics.incr("columnar_queries")
+    tracing.slow_query(sql, (time.perf_counter() - started) * 1000, qr.row_count,
+                       engine="duckdb")
+    return qr
+
+if __name__ == '__main__':
+    from .database import engine
+
+    written = export_snapshot(engine)
+    for table, rows in written.items():
+        print(f"{table}: {rows} rows")
+    print(f"✅ Snapshot written to {os.path.abspath(SNAPSHOT_DIR)}")
@@ -1,4 +1,9 @@
 # backend/app/crud.py
+from datetime import datetime
+
+from sqlalchemy import inspect as sa_inspect, select
+
+
 def get_all(session, Model):
     return session.query(Model).all()
 
@@ -10,3 +15,56 @@ def create(session, obj):
     session.commit()
     session.refresh(obj)
     return obj
+
+# — Keyset pagination for catalog tables —
+
+def primary_key(Model):
+    """Single-column primary key used as the keyset cursor"""
+    return sa_inspect(Model).primary_key[0]
+
+def parse_filters(Model, args):
+    """Turn query-string args into {column: typed value}; raises ValueError"""
+    columns = sa_inspect(Model).columns
+    filters = {}
+    for name, raw in args.items():
+        if name not in columns:
+            raise ValueError(f"unknown filter column: {name}")
+        filters[name] = coerce_value(columns[name], raw)
+    return filters
+
+def coerce_value(column, raw):
+    """Coerce a raw string to the column's Python type"""
+    py_type = column.type.python_type
+    if py_type is datetime:
+        return datetime.fromisoformat(raw)
+    return py_type(raw)
+
+def _keyset_select(Model, columns, after=None, filters=None):
+    pk = primary_key(Model)
+    stmt = select(*columns)
+    for name, value in (filters or {}).items():
+        stmt = stmt.where(getattr(Model, name) == value)
+    if after is not None:
+        stmt = stmt.where(pk > after)
+    return stmt.order_by(pk)
+
+def get_page_rows(conn, Model, columns, limit, after=None, filters=None):
+    """(rows, next_cursor) with rows as tuples of `columns`; next_cursor is
+    None on the last page"""
+    stmt = _keyset_select(Model, columns, after, filters).limit(limit + 1)
+    rows = conn.execute(stmt).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    pk_index = [c.key for c in columns].index(primary_key(Model).key)
+    return rows, rows[-1][pk_index]
+
+def iter_row_tuples(conn, Model, columns, after=None, filters=None, limit=None,
+                    batch_size=1000):
+    """Tuples of `columns` from a server-side cursor, batch_size at a time"""
+    stmt = _keyset_select(Model, columns, after, filters)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(stmt)
+    for partition in result.partitions():
+        yield from partition
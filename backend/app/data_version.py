@@ -0,0 +1,59 @@
+# backend/app/data_version.py
+#
+# Per-table data versions, bumped by load_data in the same transaction as the
+# rows it writes. The global generation (sum of all table versions) only ever
+# grows, so anything cached against it is invalidated by the next load.
+
+import datetime
+import os
+import threading
+import time
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from .models import DataVersion
+
+DATA_VERSION_CHECK_SECONDS = float(os.getenv("DATA_VERSION_CHECK_SECONDS", "2"))
+
+_table = DataVersion.__table__
+_lock = threading.Lock()
+_cache = {"versions": {}, "checked_at": None}
+
+
+def bump(conn, table_names):
+    """Increment the version of each table (call inside the load transaction)"""
+    now = datetime.datetime.utcnow()
+    for name in table_names:
+        updated = conn.execute(
+            _table.update()
+            .where(_table.c.table_name == name)
+            .values(version=_table.c.version + 1, updated_at=now)
+        ).rowcount
+        if not updated:
+            conn.execute(_table.insert().values(table_name=name, version=1, updated_at=now))
+    refresh()
+
+def refresh():
+    """Drop the in-process copy so the next read hits the database"""
+    with _lock:
+        _cache["checked_at"] = None
+
+def versions(engine):
+    """{table_name: version}, re-read at most every DATA_VERSION_CHECK_SECONDS"""
+    now = time.monotonic()
+    with _lock:
+        checked_at = _cache["checked_at"]
+        if checked_at is not None and now - checked_at < DATA_VERSION_CHECK_SECONDS:
+            return _cache["versions"]
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(select(_table.c.table_name, _table.c.version)).all()
+    except OperationalError:
+        rows = []  # table not created yet
+    with _lock:
+        _cache["versions"] = dict(rows)
+        _cache["checked_at"] = now
+        return _cache["versions"]
+
+def generation(engine):
+    """Monotonic counter that changes whenever any table is reloaded"""
+    return sum(versions(engine).values())
@@ -1,16 +1,83 @@
 # backend/app/database.py
+#
+# One engine factory for the whole app. SQLite connections are tuned on
+# connect: WAL journal (readers never block the writer), synchronous=NORMAL,
+# configurable page cache / mmap and a busy timeout. `readonly_engine` is a
+# separate pool opened with mode=ro + query_only for the LLM's analytical
+# queries, so they run concurrently with chat writes and can never mutate data.
+
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from . import metrics
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH  = os.path.join(BASE_DIR, "../sql_app.db")
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DB_PATH}")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negative = KiB
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "5"))
+
+
+def _sqlite_file(url):
+    """Database file path for a file-backed SQLite URL, else None"""
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite":
+        return None
+    if not url.database or url.database == ":memory:" or url.query.get("mode") == "memory":
+        return None
+    return os.path.abspath(url.database)
+
+def _set_pragmas(read_only):
+    def on_connect(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        if not read_only:
+            cur.execute("PRAGMA journal_mode=WAL")
+            cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cur.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        cur.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        if read_only:
+            cur.execute("PRAGMA query_only=1")
+        cur.close()
+    return on_connect
+
+def make_engine(url=DATABASE_URL, read_only=False, pool_size=None):
+    """Create an engine; SQLite files get WAL/pragmas, read_only opens mode=ro"""
+    path = _sqlite_file(url)
+    if path is None:
+        return create_engine(url, connect_args={"check_same_thread": False}
+                             if url.startswith("sqlite") else {})
+    if read_only:
+        url = f"sqlite:///file:{path}?mode=ro&uri=true"
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_size=pool_size or (READ_POOL_SIZE if read_only else POOL_SIZE),
+    )
+    event.listen(engine, "connect", _set_pragmas(read_only))
+    return engine
+
+engine = make_engine()
+# In-memory databases are per-connection, so they share the write engine
+readonly_engine = make_engine(read_only=True) if _sqlite_file(DATABASE_URL) else engine
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
+
+def _pool_gauge(method):
+    def sample():
+        pools = [("write", engine)]
+        if readonly_engine is not engine:
+            pools.append(("read", readonly_engine))
+        return [({"pool": name}, getattr(e.pool, method)())
+                for name, e in pools if hasattr(e.pool, method)]
+    return sample
+
+metrics.register_gauge("db_pool_size", _pool_gauge("size"))
+metrics.register_gauge("db_pool_checked_out", _pool_gauge("checkedout"))
+metrics.register_gauge("db_pool_overflow", _pool_gauge("overflow"))
@@ -0,0 +1,204 @@
+# backend/app/datagen.py
+#
+# Deterministic synthetic commerce dataset at a chosen scale, written as the
+# CSVs load_data expects. Rows are consistent with each other: every order
+# item points at an existing order, user, product and the inventory item it
+# sold; inventory rows copy their product's fields; order statuses and
+# timestamps agree; orders.num_of_item matches its items.
+#
+# Scale 1 ≈ 10k users, 2k products, 12.5k orders, 18k order items and 49k
+# inventory items; everything but distribution centers grows linearly.
+#
+#   python -m app.datagen --scale 10 --out /tmp/data10 [--seed 42]
+#   DATA_DIR=/tmp/data10 python -m app.load_data
+
+import argparse
+import csv
+import datetime
+import os
+import random
+import shutil
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DATA_DIR = os.path.join(BASE_DIR, "../data")
+
+USERS_PER_SCALE = 10000
+PRODUCTS_PER_SCALE = 2000
+ORDERS_PER_SCALE = 12500
+UNSOLD_PER_SOLD = 1.7  # inventory items still in stock per item sold
+
+CATEGORIES = {
+    "Women": ["Tops & Tees", "Dresses", "Jeans", "Sweaters", "Intimates", "Skirts"],
+    "Men": ["Tops & Tees", "Jeans", "Outerwear & Coats", "Shorts", "Suits", "Socks"],
+}
+BRANDS = ["Allegra K", "Calvin Klein", "Carhartt", "Columbia", "Hanes", "Levi's",
+          "Nike", "Quiksilver", "Ray-Ban", "Tommy Hilfiger", "Wrangler", "Volcom"]
+ADJECTIVES = ["Classic", "Slim", "Relaxed", "Vintage", "Essential", "Premium", "Cozy", "Sport"]
+FIRST_NAMES = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda",
+               "David", "Elizabeth", "Maria", "Wei", "Aisha", "Carlos", "Yuki", "Olga"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+              "Lopez", "Chen", "Kim", "Nguyen", "Patel", "Silva", "Müller", "Rossi"]
+CITIES = [("New York", "New York", "United States", 40.71, -74.0),
+          ("Los Angeles", "California", "United States", 34.05, -118.24),
+          ("Chicago", "Illinois", "United States", 41.88, -87.63),
+          ("Houston", "Texas", "United States", 29.76, -95.37),
+          ("London", "England", "United Kingdom", 51.51, -0.13),
+          ("Paris", "Île-de-France", "France", 48.86, 2.35),
+          ("Berlin", "Berlin", "Germany", 52.52, 13.4),
+          ("São Paulo", "São Paulo", "Brasil", -23.55, -46.63),
+          ("Shanghai", "Shanghai", "China", 31.23, 121.47),
+          ("Tokyo", "Tokyo", "Japan", 35.68, 139.69)]
+TRAFFIC_SOURCES = ["Search", "Organic", "Facebook", "Email", "Display"]
+ORDER_STATUSES = ["Complete", "Shipped", "Processing", "Cancelled", "Returned"]
+ORDER_STATUS_WEIGHTS = [25, 30, 20, 15, 10]
+
+START = datetime.datetime(2019, 1, 1)
+SPAN_SECONDS = 5 * 365 * 24 * 3600
+
+
+def _ts(value):
+    return value.strftime("%Y-%m-%d %H:%M:%S+00:00") if value else ""
+
+def _writer(out_dir, name, header):
+    f = open(os.path.join(out_dir, name), "w", newline="", encoding="utf-8")
+    w = csv.writer(f)
+    w.writerow(header)
+    return f, w
+
+def distribution_center_ids(out_dir):
+    """Copy distribution_centers.csv from backend/data and return its ids"""
+    target = os.path.join(out_dir, "distribution_centers.csv")
+    shutil.copyfile(os.path.join(SOURCE_DATA_DIR, "distribution_centers.csv"), target)
+    with open(target, newline="", encoding="utf-8") as f:
+        return [int(row["id"]) for row in csv.DictReader(f)]
+
+def write_products(out_dir, rng, count, dc_ids):
+    f, w = _writer(out_dir, "products.csv", [
+        "id", "cost", "category", "name", "brand", "retail_price", "department",
+        "sku", "distribution_center_id"])
+    products = []
+    with f:
+        for pid in range(1, count + 1):
+            department = rng.choice(list(CATEGORIES))
+            category = rng.choice(CATEGORIES[department])
+            brand = rng.choice(BRANDS)
+            name = f"{brand} {rng.choice(ADJECTIVES)} {category.split(' ')[0]} {pid}"
+            retail = round(rng.lognormvariate(3.5, 0.7), 2)
+            cost = round(retail * rng.uniform(0.35, 0.6), 2)
+            p = (pid, cost, category, name, brand, retail, department,
+                 f"SKU{pid:08d}", rng.choice(dc_ids))
+            w.writerow(p)
+            products.append(p)
+    return products
+
+def write_users(out_dir, rng, count):
+    f, w = _writer(out_dir, "users.csv", [
+        "id", "first_name", "last_name", "email", "age", "gender", "state",
+        "street_address", "postal_code", "city", "country", "latitude", "longitude",
+        "traffic_source", "created_at"])
+    genders = []
+    with f:
+        for uid in range(1, count + 1):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            city, state, country, lat, lon = rng.choice(CITIES)
+            gender = rng.choice("MF")
+            created = START + datetime.timedelta(seconds=rng.randrange(SPAN_SECONDS))
+            w.writerow([
+                uid, first, last, f"{first}.{last}.{uid}@example.com".lower(),
+                rng.randint(12, 70), gender, state,
+                f"{rng.randint(1, 9999)} {rng.choice(LAST_NAMES)} Street",
+                f"{rng.randint(10000, 99999)}", city, country,
+                round(lat + rng.uniform(-0.2, 0.2), 6), round(lon + rng.uniform(-0.2, 0.2), 6),
+                rng.choice(TRAFFIC_SOURCES), _ts(created),
+            ])
+            genders.append(gender)
+    return genders
+
+def _inventory_row(iid, product, created, sold):
+    pid, cost, category, name, brand, retail, department, sku, dc = product
+    return [iid, pid, _ts(created), _ts(sold), cost, category, name, brand, retail,
+            department, sku, dc]
+
+INVENTORY_HEADER = [
+    "id", "product_id", "created_at", "sold_at", "cost", "product_category", "product_name",
+    "product_brand", "product_retail_price", "product_department", "product_sku",
+    "product_distribution_center_id"]
+
+def write_orders(out_dir, rng, count, products, user_genders):
+    """orders, order_items and their sold inventory items; returns (items, inventory)"""
+    fo, wo = _writer(out_dir, "orders.csv", [
+        "order_id", "user_id", "status", "gender", "created_at", "returned_at",
+        "shipped_at", "delivered_at", "num_of_item"])
+    fi, wi = _writer(out_dir, "order_items.csv", [
+        "id", "order_id", "user_id", "product_id", "inventory_item_id", "status",
+        "created_at", "shipped_at", "delivered_at", "returned_at"])
+    fv, wv = _writer(out_dir, "inventory_items.csv", INVENTORY_HEADER)
+    item_id = 0
+    with fo, fi, fv:
+        for oid in range(1, count + 1):
+            uid = rng.randint(1, len(user_genders))
+            status = rng.choices(ORDER_STATUSES, ORDER_STATUS_WEIGHTS)[0]
+            created = START + datetime.timedelta(seconds=rng.randrange(SPAN_SECONDS))
+            shipped = delivered = returned = None
+            if status in ("Shipped", "Complete", "Returned"):
+                shipped = created + datetime.timedelta(hours=rng.randint(2, 72))
+            if status in ("Complete", "Returned"):
+                delivered = shipped + datetime.timedelta(hours=rng.randint(24, 120))
+            if status == "Returned":
+                returned = delivered + datetime.timedelta(days=rng.randint(1, 20))
+            n_items = rng.choices([1, 2, 3, 4], [65, 22, 9, 4])[0]
+            wo.writerow([oid, uid, status, user_genders[uid - 1], _ts(created), _ts(returned),
+                         _ts(shipped), _ts(delivered), n_items])
+            for _ in range(n_items):
+                item_id += 1
+                product = rng.choice(products)
+                stocked = created - datetime.timedelta(days=rng.randint(1, 180))
+                wv.writerow(_inventory_row(item_id, product, stocked, created))
+                wi.writerow([item_id, oid, uid, product[0], item_id, status, _ts(created),
+                             _ts(shipped), _ts(delivered), _ts(returned)])
+    return item_id
+
+def append_unsold_inventory(out_dir, rng, first_id, count, products):
+    with open(os.path.join(out_dir, "inventory_items.csv"), "a", newline="",
+              encoding="utf-8") as f:
+        w = csv.writer(f)
+        for iid in range(first_id, first_id + count):
+            stocked = START + datetime.timedelta(seconds=rng.randrange(SPAN_SECONDS))
+            w.writerow(_inventory_row(iid, rng.choice(products), stocked, None))
+
+def generate(out_dir, scale=1.0, seed=42):
+    """Write every CSV for `scale` into out_dir; returns {file: rows}"""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    dc_ids = distribution_center_ids(out_dir)
+    products = write_products(out_dir, rng, max(int(PRODUCTS_PER_SCALE * scale), 1), dc_ids)
+    genders = write_users(out_dir, rng, max(int(USERS_PER_SCALE * scale), 1))
+    orders = max(int(ORDERS_PER_SCALE * scale), 1)
+    sold = write_orders(out_dir, rng, orders, products, genders)
+    unsold = int(sold * UNSOLD_PER_SOLD)
+    append_unsold_inventory(out_dir, rng, sold + 1, unsold, products)
+    return {
+        "distribution_centers.csv": len(dc_ids),
+        "products.csv": len(products),
+        "users.csv": len(genders),
+        "orders.csv": orders,
+        "order_items.csv": sold,
+        "inventory_items.csv": sold + unsold,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic commerce dataset")
+    parser.add_argument("--scale", type=float, default=1.0, help="1 to 100 (fractions allowed)")
+    parser.add_argument("--out", required=True, help="output directory for the CSVs")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    counts = generate(args.out, args.scale, args.seed)
+    for name, rows in counts.items():
+        print(f"{name}: {rows:,} rows")
+    print(f"✅ Generated scale {args.scale:g} in {time.perf_counter() - started:.1f}s → {args.out}")
+
+if __name__ == '__main__':
+    main()
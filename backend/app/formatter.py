@@ -0,0 +1,100 @@
+# backend/app/formatter.py
+#
+# Bounded result formatting for the response prompt.
+#
+# Rows are pulled with fetchmany(); only the first RESULT_PREVIEW_ROWS are
+# kept, while count/sum/min/max for numeric columns are accumulated over every
+# row streamed. Larger results render as a compact table plus those summary
+# statistics, so prompt size and memory stay bounded without pandas.
+# With a cap (the governor's MAX_RESULT_ROWS), a row past it marks the result
+# as truncated: counts and statistics then cover only the first `cap` rows and
+# are rendered as such, never as totals.
+
+import os
+from collections import namedtuple
+
+RESULT_PREVIEW_ROWS = int(os.getenv("RESULT_PREVIEW_ROWS", "20"))
+RESULT_CELL_CHARS = int(os.getenv("RESULT_CELL_CHARS", "60"))
+FETCH_BATCH = 256
+
+QueryResult = namedtuple("QueryResult", ["columns", "rows", "row_count", "stats", "truncated"],
+                         defaults=(False,))
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def collect(result, max_rows=None, cap=None):
+    """Drain a cursor in batches into a QueryResult with a bounded preview.
+
+    With `cap`, rows past it are not counted and the result is marked
+    truncated (the governor's LIMIT lets one such row through as a probe).
+    """
+    max_rows = RESULT_PREVIEW_ROWS if max_rows is None else max_rows
+    columns = tuple(result.keys())
+    preview = []
+    row_count = 0
+    stats = {}
+    truncated = False
+    while not truncated:
+        batch = result.fetchmany(FETCH_BATCH)
+        if not batch:
+            break
+        for row in batch:
+            if cap is not None and row_count >= cap:
+                truncated = True
+                break
+            row_count += 1
+            if len(preview) < max_rows:
+                preview.append(tuple(row))
+            for col, value in zip(columns, row):
+                if not _is_number(value):
+                    continue
+                s = stats.get(col)
+                if s is None:
+                    stats[col] = {"count": 1, "sum": value, "min": value, "max": value}
+                else:
+                    s["count"] += 1
+                    s["sum"] += value
+                    s["min"] = min(s["min"], value)
+                    s["max"] = max(s["max"], value)
+    return QueryResult(columns, preview, row_count, stats, truncated)
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        text = f"{value:,.2f}" if abs(value) >= 1 else f"{value:.4g}"
+    else:
+        text = str(value)
+    text = text.replace("|", "/").replace("\n", " ")
+    if len(text) > RESULT_CELL_CHARS:
+        text = text[:RESULT_CELL_CHARS - 1] + "…"
+    return text
+
+def render_table(columns, rows):
+    lines = ["| " + " | ".join(columns) + " |",
+             "|" + "|".join("---" for _ in columns) + "|"]
+    lines += ["| " + " | ".join(_cell(v) for v in row) + " |" for row in rows]
+    return "\n".join(lines)
+
+def render(qr):
+    """Prompt text for a QueryResult"""
+    if not qr.row_count:
+        return "No results found"
+    text = render_table(qr.columns, qr.rows)
+    if qr.truncated:
+        lines = [text, "",
+                 f"(at least {qr.row_count} rows (capped), first {len(qr.rows)} shown)",
+                 f"Statistics over the first {qr.row_count} rows only, NOT totals:"]
+    elif qr.row_count <= len(qr.rows):
+        return text
+    else:
+        lines = [text, "",
+                 f"({qr.row_count} rows in total, first {len(qr.rows)} shown)"]
+    for col, s in qr.stats.items():
+        lines.append(
+            f"{col}: count={s['count']}, sum={_cell(s['sum'])}, "
+            f"min={_cell(s['min'])}, max={_cell(s['max'])}"
+        )
+    return "\n".join(lines)
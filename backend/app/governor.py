@@ -0,0 +1,141 @@
+# backend/app/governor.py
+#
+# Cost guard for LLM-generated SQL, applied before and during execution:
+#
+# 1. ensure_limit() appends a LIMIT (or lowers an existing one) so no query
+#    returns more than MAX_RESULT_ROWS rows. The injected bound is one row
+#    higher: that probe row tells the executor (formatter.collect with
+#    cap=MAX_RESULT_ROWS) a capped result from a complete one.
+# 2. check_plan() inspects EXPLAIN QUERY PLAN and rejects statements that
+#    full-scan more than one large table (nested-loop/cross joins without an
+#    index); a single large scan is allowed but counted.
+# 3. deadline() installs a SQLite progress handler that interrupts the
+#    statement once QUERY_TIMEOUT_SECONDS of wall-clock time has passed.
+#
+# Every intervention is counted in metrics under governor_*.
+
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from . import metrics
+
+MAX_RESULT_ROWS = int(os.getenv("MAX_RESULT_ROWS", "1000"))
+QUERY_TIMEOUT_SECONDS = float(os.getenv("QUERY_TIMEOUT_SECONDS", "10"))
+LARGE_TABLE_ROWS = int(os.getenv("LARGE_TABLE_ROWS", "100000"))
+GOVERNOR_SCAN_POLICY = os.getenv("GOVERNOR_SCAN_POLICY", "reject")  # or "warn"
+PROGRESS_STEPS = 10000  # VM instructions between deadline checks
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+# string literals / quoted identifiers (kept) or comments (dropped)
+_COMMENT_RE = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")|--[^\n]*|/\*.*?(?:\*/|$)""", re.DOTALL)
+# LIMIT count [OFFSET n], or SQLite's LIMIT offset, count
+_LIMIT_RE = re.compile(
+    r"\bLIMIT\s+(?:\d+\s*,\s*)?(?P<count>\d+)(?:\s+OFFSET\s+\d+)?\s*$", re.IGNORECASE
+)
+
+
+class GovernorError(Exception):
+    """Statement refused or stopped by the governor; str() is user-facing"""
+
+class QueryRejected(GovernorError):
+    pass
+
+class QueryTimeout(GovernorError):
+    pass
+
+
+def _outer_level(sql):
+    """SQL with string literals and parenthesized parts blanked out"""
+    sql = _STRING_RE.sub(lambda m: "_" * len(m.group(0)), sql)
+    out, depth = [], 0
+    for ch in sql:
+        if ch == "(":
+            depth += 1
+        out.append(ch if depth == 0 else "_")
+        if ch == ")" and depth:
+            depth -= 1
+    return "".join(out)
+
+def strip_comments(sql):
+    """SQL without -- and /* */ comments (string literals untouched)"""
+    return _COMMENT_RE.sub(lambda m: m.group(1) or " ", sql)
+
+def ensure_limit(sql, max_rows=None):
+    """Add or cap the statement's outer LIMIT"""
+    max_rows = MAX_RESULT_ROWS if max_rows is None else max_rows
+    bound = max_rows + 1  # one probe row past the cap
+    # a trailing `-- comment` would otherwise swallow an appended LIMIT
+    sql = strip_comments(sql).strip().rstrip(";").strip()
+    outer = _outer_level(sql)
+    m = _LIMIT_RE.search(outer)
+    if m:
+        if int(m.group("count")) <= max_rows:
+            return sql
+        metrics.incr("governor_limit_capped")
+        return sql[:m.start("count")] + str(bound) + sql[m.end("count"):]
+    if re.search(r"\bLIMIT\b", outer, re.IGNORECASE):
+        # non-literal LIMIT expression: bound it from the outside
+        metrics.incr("governor_limit_wrapped")
+        return f"SELECT * FROM ({sql}) LIMIT {bound}"
+    metrics.incr("governor_limit_injected")
+    return f"{sql} LIMIT {bound}"
+
+def table_rows(conn, table):
+    """Cheap row-count estimate (max rowid)"""
+    return conn.execute(text(f'SELECT MAX(rowid) FROM "{table}"')).scalar() or 0
+
+def check_plan(conn, plan, aliases, large_rows=None):
+    """Raise QueryRejected for plans that full-scan several large tables"""
+    large_rows = LARGE_TABLE_ROWS if large_rows is None else large_rows
+    large_scans = []
+    for detail in plan:
+        m = re.match(r"SCAN (?:TABLE )?(\w+)", detail)
+        if not m:
+            continue
+        table = aliases.get(m.group(1))
+        if table and table_rows(conn, table) >= large_rows:
+            large_scans.append(table)
+    if large_scans:
+        metrics.incr("governor_large_scans", len(large_scans))
+    if len(large_scans) > 1 and GOVERNOR_SCAN_POLICY == "reject":
+        metrics.incr("governor_rejected")
+        raise QueryRejected(
+            "That question would need to cross-scan "
+            f"{' and '.join(sorted(set(large_scans)))} in full. "
+            "Could you narrow it down (e.g. a product, order, date range)?"
+        )
+    return large_scans
+
+@contextmanager
+def deadline(conn, seconds=None):
+    """Interrupt any statement on `conn` that runs past `seconds`"""
+    seconds = QUERY_TIMEOUT_SECONDS if seconds is None else seconds
+    raw = conn.connection.dbapi_connection
+    if not isinstance(raw, sqlite3.Connection) or seconds <= 0:
+        yield
+        return
+    expires = time.monotonic() + seconds
+    fired = []
+
+    def handler():
+        if time.monotonic() > expires:
+            fired.append(True)
+            return 1
+        return 0
+
+    raw.set_progress_handler(handler, PROGRESS_STEPS)
+    try:
+        yield
+    except OperationalError as e:
+        if fired and "interrupted" in str(e.orig):
+            metrics.incr("governor_interrupted")
+            raise QueryTimeout(
+                "That query took too long to run. Could you ask something more specific?"
+            ) from e
+        raise
+    finally:
+        raw.set_progress_handler(None, PROGRESS_STEPS)
@@ -0,0 +1,111 @@
+# backend/app/http_cache.py
+#
+# HTTP caching for the read-only catalog routes.
+#
+# Catalog tables only change when load_data runs, which bumps their
+# data_version. A response's ETag is derived from the table's version plus the
+# request's query string, so clients revalidating with If-None-Match get a
+# 304 until the next load. Bodies are kept pre-compressed (br when the brotli
+# package is installed, gzip otherwise or when that is all the client takes)
+# in a byte-bounded LRU, so a repeat fetch is a dict lookup.
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from . import data_version, metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+HTTP_CACHE_BYTES = int(os.getenv("HTTP_CACHE_BYTES", str(16 * 1024 * 1024)))
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "512"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def etag(table, args, engine):
+    """Weak-comparable tag for `table` at its current data version and these args"""
+    version = data_version.versions(engine).get(table, 0)
+    query = "&".join(f"{k}={v}" for k, v in sorted(args.items(multi=True)))
+    digest = hashlib.sha1(query.encode()).hexdigest()[:12]
+    return f"{table}-v{version}-{digest}"
+
+def negotiate(accept_encoding):
+    """Best encoding we can produce that the client accepts"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.lower()] = q
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return "identity"
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+class ResponseCache:
+    """Byte-budgeted LRU of encoded bodies keyed by (etag, encoding)"""
+
+    def __init__(self, max_bytes=HTTP_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, tag, encoding):
+        """(body, encoding, headers) or None"""
+        with self._lock:
+            entry = self._entries.get((tag, encoding))
+            if entry is None:
+                return None
+            self._entries.move_to_end((tag, encoding))
+            return entry
+
+    def put(self, tag, body, headers, encoding):
+        """Encode and store a body; returns (body, encoding, headers) as served"""
+        served = encoding if len(body) >= COMPRESS_MIN_BYTES else "identity"
+        entry = (compress(body, served), served, headers)
+        size = len(entry[0]) + 256
+        if size > self.max_bytes:
+            return entry
+        with self._lock:
+            old = self._entries.pop((tag, encoding), None)
+            if old is not None:
+                self._bytes -= len(old[0]) + 256
+            self._entries[(tag, encoding)] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, dropped = self._entries.popitem(last=False)
+                self._bytes -= len(dropped[0]) + 256
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def size(self):
+        with self._lock:
+            return self._bytes
+
+
+response_cache = ResponseCache()
+metrics.register_gauge("http_cache_bytes", response_cache.size)
@@ -0,0 +1,273 @@
+# backend/app/index_advisor.py
+#
+# Workload-driven index advisor for the LLM-generated SQL.
+#
+# run_query() records every statement it executes together with its EXPLAIN
+# QUERY PLAN output and timing. Records are aggregated in memory by
+# canonicalized SQL (count, total ms) and merged into `query_stats` by a
+# background flush every WORKLOAD_FLUSH_SECONDS, so chat turns never write;
+# the table is trimmed to the WORKLOAD_MAX_STATEMENTS most expensive
+# statements. The advisor streams those aggregates:
+# for each table the plan reports as a full SCAN it collects the columns the
+# statement filters/joins on (equality columns first, then one range column)
+# and ranks the resulting composite index candidates by total time spent.
+#
+#   python -m app.index_advisor                 # show recommendations
+#   python -m app.index_advisor --apply 3       # create the top 3
+#   python -m app.index_advisor --migrate-only  # only ensure model indexes
+#
+# Every run first creates any index declared on the models that is missing
+# from an existing database (create_all only adds indexes to new tables).
+
+import argparse
+import atexit
+import datetime
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from sqlalchemy import delete, inspect, select, text, update
+from .database import Base, engine
+from .models import QueryStat
+from .result_cache import canonicalize_sql
+
+logger = logging.getLogger(__name__)
+
+WORKLOAD_LOG = os.getenv("WORKLOAD_LOG", "1") == "1"
+WORKLOAD_FLUSH_SECONDS = float(os.getenv("WORKLOAD_FLUSH_SECONDS", "30"))
+WORKLOAD_MAX_STATEMENTS = int(os.getenv("WORKLOAD_MAX_STATEMENTS", "2000"))
+MAX_INDEX_COLUMNS = 3
+
+_TABLE_RE = re.compile(
+    r"\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)(?:\s+(?:AS\s+)?([A-Za-z_]\w*))?", re.IGNORECASE
+)
+_PREDICATE_RE = re.compile(
+    r"(?:\b([A-Za-z_]\w*)\.)?\b([A-Za-z_]\w*)\s*(=|==|<=|>=|<>|!=|<|>|\bIN\b|\bBETWEEN\b|\bLIKE\b)",
+    re.IGNORECASE,
+)
+_JOIN_RHS_RE = re.compile(
+    r"=\s*\b([A-Za-z_]\w*)\.([A-Za-z_]\w*)\b", re.IGNORECASE
+)
+_NOT_ALIAS = {
+    "where", "join", "on", "group", "order", "limit", "inner", "left", "right",
+    "cross", "outer", "natural", "using", "union", "having", "window", "as",
+}
+
+
+# — Recording —
+
+def explain(conn, sql):
+    """EXPLAIN QUERY PLAN detail lines for a statement"""
+    rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+    return [row[-1] for row in rows]
+
+_pending = {}  # sql hash -> aggregate not yet written to query_stats
+_pending_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+def record(sql, plan, duration_ms, row_count):
+    """Count one executed statement in memory; flush() writes the aggregates"""
+    global _last_flush
+    if not WORKLOAD_LOG:
+        return
+    sql_hash = hashlib.sha1(canonicalize_sql(sql).encode()).hexdigest()
+    with _pending_lock:
+        entry = _pending.get(sql_hash)
+        if entry is None:
+            entry = _pending[sql_hash] = {"sql": sql, "count": 0, "total_ms": 0.0}
+        entry["count"] += 1
+        entry["total_ms"] += duration_ms or 0.0
+        entry["plan"] = "\n".join(plan)
+        entry["row_count"] = row_count
+        entry["last_seen"] = datetime.datetime.utcnow()
+        due = (time.monotonic() - _last_flush >= WORKLOAD_FLUSH_SECONDS
+               or len(_pending) >= WORKLOAD_MAX_STATEMENTS)
+        if due:
+            _last_flush = time.monotonic()
+    if due and not _flush_lock.locked():
+        threading.Thread(target=flush, name="workload-flush", daemon=True).start()
+
+def flush():
+    """Merge pending aggregates into query_stats and trim it (never raises)"""
+    with _flush_lock:
+        with _pending_lock:
+            batch = dict(_pending)
+            _pending.clear()
+        if not batch:
+            return 0
+        try:
+            with engine.begin() as conn:
+                for sql_hash, e in batch.items():
+                    merged = conn.execute(
+                        update(QueryStat).where(QueryStat.sql_hash == sql_hash).values(
+                            count=QueryStat.count + e["count"],
+                            total_ms=QueryStat.total_ms + e["total_ms"],
+                            plan=e["plan"], row_count=e["row_count"], last_seen=e["last_seen"],
+                        )
+                    ).rowcount
+                    if not merged:
+                        conn.execute(QueryStat.__table__.insert().values(sql_hash=sql_hash, **e))
+                keep = (select(QueryStat.sql_hash)
+                        .order_by(QueryStat.total_ms.desc(), QueryStat.last_seen.desc())
+                        .limit(WORKLOAD_MAX_STATEMENTS))
+                conn.execute(delete(QueryStat).where(QueryStat.sql_hash.not_in(keep)))
+        except Exception as e:
+            logger.warning(f"Could not record workload entries: {e}")
+            return 0
+        return len(batch)
+
+atexit.register(flush)
+
+
+# — Analysis —
+
+def table_aliases(sql):
+    """{alias or table name: table name} for every FROM/JOIN target"""
+    known = Base.metadata.tables
+    aliases = {}
+    for table, alias in _TABLE_RE.findall(sql):
+        if table not in known:
+            continue
+        aliases[table] = table
+        if alias and alias.lower() not in _NOT_ALIAS:
+            aliases[alias] = table
+    return aliases
+
+def predicate_columns(sql, aliases):
+    """{table: (equality columns, range columns)} referenced by predicates"""
+    known = Base.metadata.tables
+    tables = set(aliases.values())
+    found = defaultdict(lambda: ([], []))
+
+    def add(table, column, equality):
+        if table not in known or column not in known[table].c:
+            return
+        eq, rng = found[table]
+        target = eq if equality else rng
+        if column not in eq and column not in target:
+            target.append(column)
+        if equality and column in rng:
+            rng.remove(column)
+
+    for qualifier, column, op in _PREDICATE_RE.findall(sql):
+        equality = op.upper() in ("=", "==", "IN")
+        if qualifier:
+            add(aliases.get(qualifier), column, equality)
+        else:
+            owners = [t for t in tables if column in known[t].c]
+            if len(owners) == 1:
+                add(owners[0], column, equality)
+    # right-hand side of `a.x = b.y` join conditions
+    for qualifier, column in _JOIN_RHS_RE.findall(sql):
+        add(aliases.get(qualifier), column, True)
+    return found
+
+def scanned_tables(plan, aliases):
+    """Tables the plan reads with a full SCAN (of the table or a whole index)"""
+    scanned = set()
+    for detail in plan:
+        m = re.match(r"SCAN (?:TABLE )?(\w+)", detail)
+        if m:
+            table = aliases.get(m.group(1))
+            if table:
+                scanned.add(table)
+    return scanned
+
+def existing_indexes(table):
+    insp = inspect(engine)
+    indexes = [tuple(ix["column_names"]) for ix in insp.get_indexes(table)]
+    pk = tuple(insp.get_pk_constraint(table).get("constrained_columns") or ())
+    if pk:
+        indexes.append(pk)
+    return indexes
+
+def recommend(limit=None, min_count=1):
+    """Ranked composite index candidates from the recorded workload"""
+    flush()
+    candidates = {}
+    with engine.connect() as conn:
+        entries = conn.execution_options(stream_results=True, yield_per=500).execute(
+            select(QueryStat.sql, QueryStat.plan, QueryStat.count, QueryStat.total_ms)
+        )
+        for sql, plan, count, total_ms in entries:
+            aliases = table_aliases(sql)
+            columns = predicate_columns(sql, aliases)
+            for table in scanned_tables((plan or "").splitlines(), aliases):
+                eq, rng = columns.get(table, ([], []))
+                cols = tuple((eq + rng[:1])[:MAX_INDEX_COLUMNS])
+                if not cols:
+                    continue
+                c = candidates.setdefault((table, cols), {
+                    "table": table, "columns": list(cols), "queries": 0, "total_ms": 0.0,
+                })
+                c["queries"] += count
+                c["total_ms"] += total_ms or 0.0
+
+    results = []
+    for (table, cols), c in candidates.items():
+        if c["queries"] < min_count:
+            continue
+        if any(ix[:len(cols)] == cols for ix in existing_indexes(table)):
+            continue
+        c["name"] = index_name(table, cols)
+        results.append(c)
+    results.sort(key=lambda c: (c["total_ms"], c["queries"]), reverse=True)
+    return results[:limit] if limit else results
+
+
+# — Migration —
+
+def index_name(table, columns):
+    return f"ix_auto_{table}_{'_'.join(columns)}"
+
+def apply(recommendation):
+    cols = ", ".join(recommendation["columns"])
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {recommendation['name']} "
+            f"ON {recommendation['table']} ({cols})"
+        ))
+        if engine.dialect.name == "sqlite":
+            conn.execute(text(f"ANALYZE {recommendation['table']}"))
+
+def ensure_model_indexes():
+    """Create indexes declared on the models but missing from the database"""
+    names = []
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+            names.append(index.name)
+    return names
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recommend/apply indexes from the SQL workload")
+    parser.add_argument("--apply", type=int, default=0, metavar="N",
+                        help="create the top N recommended indexes")
+    parser.add_argument("--min-count", type=int, default=2,
+                        help="ignore candidates seen in fewer statements")
+    parser.add_argument("--migrate-only", action="store_true",
+                        help="only create missing model-declared indexes")
+    args = parser.parse_args(argv)
+
+    Base.metadata.create_all(bind=engine)
+    ensure_model_indexes()
+    if args.migrate_only:
+        print("✅ Model indexes up to date.")
+        return
+
+    recs = recommend(min_count=args.min_count)
+    if not recs:
+        print("No index recommendations.")
+    for i, rec in enumerate(recs, 1):
+        print(f"{i}. {rec['name']} ON {rec['table']}({', '.join(rec['columns'])}) "
+              f"— {rec['queries']} queries, {rec['total_ms']:.1f} ms total")
+    for rec in recs[:args.apply]:
+        apply(rec)
+        print(f"✅ Created {rec['name']}")
+
+if __name__ == '__main__':
+    main()
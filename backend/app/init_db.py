@@ -1,7 +1,16 @@
 from app.database import Base, engine
 from app import models  # ensures all models are registered
+from app import schema_info
 
-# Create all tables
-print("📦 Creating tables in the database...")
-Base.metadata.create_all(bind=engine)
-print("✅ Done.")
+
+def init_db():
+    """Create all tables (and their indexes) that do not exist yet"""
+    Base.metadata.create_all(bind=engine)
+    schema_info.invalidate()
+
+
+if __name__ == '__main__':
+    # Create all tables
+    print("📦 Creating tables in the database...")
+    init_db()
+    print("✅ Done.")
@@ -0,0 +1,172 @@
+# backend/app/intents.py
+#
+# Rule-based intent router in front of the LLM chain.
+#
+# Templated lookups ("where is order 123", "price of Classic Tee", "how many
+# items in stock at Chicago IL") are matched with regexes, answered with a
+# prewritten parameterized query and rendered from a template, so they take
+# milliseconds and no LLM call. A handler returns None when it cannot give a
+# definite answer (unknown product, ambiguous name, ...) and the message falls
+# through to the chain unchanged.
+#
+# INTENT_ROUTER=0 disables routing. Routed/fell-through messages are counted
+# in metrics under intent_*.
+
+import logging
+import os
+import re
+import time
+from collections import namedtuple
+from sqlalchemy import func, select
+from . import metrics
+from .database import readonly_engine
+from .models import DistributionCenter, InventoryByDistributionCenter, Order, Product
+
+logger = logging.getLogger(__name__)
+
+INTENT_ROUTER = os.getenv("INTENT_ROUTER", "1") == "1"
+MAX_NAME_MATCHES = 5
+
+Intent = namedtuple("Intent", ["name", "patterns", "handler"])
+
+_END = r"\s*[?.!]*$"
+_ORDER_REF = r"order\s*(?:#|no\.?|number|id)?\s*#?(?P<order_id>\d+)"
+_DC_SUFFIX = r"(?:\s+(?:distribution cent(?:er|re)|dc|warehouse))?"
+
+
+def _compile(*patterns):
+    return [re.compile(p, re.IGNORECASE) for p in patterns]
+
+def _day(value):
+    return value.strftime("%b %d, %Y") if value else None
+
+def _money(value):
+    return f"${value:,.2f}"
+
+def _like_escape(text):
+    """User text as a literal LIKE fragment (used with escape="\\")"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# — Handlers: (conn, **params) -> answer or None —
+
+def order_status(conn, order_id):
+    row = conn.execute(
+        select(Order.order_id, Order.status, Order.created_at, Order.shipped_at,
+               Order.delivered_at, Order.returned_at, Order.num_of_item)
+        .where(Order.order_id == int(order_id))
+    ).first()
+    if row is None:
+        return f"I couldn't find order {order_id}. Please check the order number."
+    parts = [f"Order {row.order_id} is {(row.status or 'in an unknown state').lower()}"]
+    if row.num_of_item:
+        parts[0] += f" ({row.num_of_item} item{'s' if row.num_of_item != 1 else ''})"
+    for label, value in (("placed", row.created_at), ("shipped", row.shipped_at),
+                         ("delivered", row.delivered_at), ("returned", row.returned_at)):
+        if value:
+            parts.append(f"{label} on {_day(value)}")
+    return ", ".join(parts) + "."
+
+def product_price(conn, product):
+    product = product.strip().strip("\"'")
+    columns = (Product.id, Product.name, Product.brand, Product.retail_price)
+    m = re.fullmatch(r"(?:product\s*(?:#|id)?\s*)?#?(\d+)", product, re.IGNORECASE)
+    if m:
+        rows = conn.execute(select(*columns).where(Product.id == int(m.group(1)))).all()
+    else:
+        if len(product) < 3:
+            return None
+        rows = conn.execute(
+            select(*columns).where(func.lower(Product.name) == product.lower())
+        ).all()
+        if not rows:
+            rows = conn.execute(
+                select(*columns)
+                .where(Product.name.ilike(f"%{_like_escape(product)}%", escape="\\"))
+                .order_by(Product.name)
+                .limit(MAX_NAME_MATCHES + 1)
+            ).all()
+    rows = [r for r in rows if r.retail_price is not None]
+    if not rows or len(rows) > MAX_NAME_MATCHES:
+        return None
+    if len(rows) == 1:
+        r = rows[0]
+        brand = f" by {r.brand}" if r.brand else ""
+        return f"{r.name}{brand} costs {_money(r.retail_price)}."
+    listed = "; ".join(f"{r.name} — {_money(r.retail_price)}" for r in rows)
+    return f"I found {len(rows)} matching products: {listed}."
+
+def stock_at_distribution_center(conn, dc):
+    name = re.sub(r"[,.]", "", dc).strip()
+    if len(name) < 3:
+        return None
+    rows = conn.execute(
+        select(DistributionCenter.name, func.sum(InventoryByDistributionCenter.in_stock_items))
+        .join(InventoryByDistributionCenter,
+              InventoryByDistributionCenter.distribution_center_id == DistributionCenter.id)
+        .where(func.replace(DistributionCenter.name, ",", "").ilike(f"{_like_escape(name)}%", escape="\\"))
+        .group_by(DistributionCenter.id, DistributionCenter.name)
+        .order_by(DistributionCenter.name)
+    ).all()
+    if not rows:
+        return None
+    if len(rows) == 1:
+        return f"The {rows[0][0]} distribution center has {rows[0][1]:,} items in stock."
+    listed = "; ".join(f"{n}: {count:,}" for n, count in rows)
+    return f"Items in stock — {listed}."
+
+
+INTENTS = [
+    Intent("order_status", _compile(
+        rf"^(?:where(?:'s| is)|what(?:'s| is) the status of|status of|track(?:ing)?(?: for)?|"
+        rf"has|did|is)\s+(?:my\s+|the\s+)?{_ORDER_REF}"
+        rf"(?:\s+(?:been\s+)?(?:shipped|arrived|delivered|returned))?{_END}",
+        rf"^(?:my\s+|the\s+)?{_ORDER_REF}\s+status{_END}",
+    ), order_status),
+    Intent("product_price", _compile(
+        rf"^(?:what(?:'s| is)\s+)?(?:the\s+)?(?:retail\s+)?price\s+(?:of|for)\s+"
+        rf"(?:the\s+)?(?P<product>.+?){_END}",
+        rf"^how much (?:is|does|do)\s+(?:the\s+)?(?P<product>.+?)(?:\s+cost)?{_END}",
+    ), product_price),
+    Intent("stock_at_distribution_center", _compile(
+        rf"^how many (?:items|products|units)?\s*(?:are\s+)?(?:(?:currently|still)\s+)?"
+        rf"(?:in stock|available|in inventory)\s+(?:at|in)\s+(?:the\s+)?(?P<dc>.+?){_DC_SUFFIX}{_END}",
+        rf"^(?:what(?:'s| is)\s+)?(?:the\s+)?(?:stock|inventory)(?:\s+level)?\s+(?:at|in)\s+"
+        rf"(?:the\s+)?(?P<dc>.+?){_DC_SUFFIX}{_END}",
+    ), stock_at_distribution_center),
+]
+
+
+def match(message):
+    """(Intent, params) for the first matching pattern, else None"""
+    text = " ".join(message.split())
+    for intent in INTENTS:
+        for pattern in intent.patterns:
+            m = pattern.match(text)
+            if m:
+                return intent, m.groupdict()
+    return None
+
+def route(message, engine=None):
+    """Templated answer for a recognised message, or None to use the LLM chain"""
+    if not INTENT_ROUTER or not message:
+        return None
+    matched = match(message)
+    if matched is None:
+        metrics.incr("intent_fallthrough")
+        return None
+    intent, params = matched
+    started = time.perf_counter()
+    try:
+        with (engine or readonly_engine).connect() as conn:
+            answer = intent.handler(conn, **params)
+    except Exception as e:
+        logger.warning(f"Intent {intent.name} failed, falling through: {e}")
+        answer = None
+    if answer is None:
+        metrics.incr("intent_fallthrough", intent=intent.name)
+        return None
+    metrics.incr("intent_routed", intent=intent.name)
+    logger.info(f"Intent {intent.name} {params} answered in "
+                f"{(time.perf_counter() - started) * 1000:.1f} ms")
+    return answer
@@ -1,15 +1,23 @@
 # backend/app/llm_chain.py
+#
+# NL→SQL chain. Importing this module is cheap: langchain/langchain_groq are
+# imported and ChatGroq is constructed on first use (or by warmup()), so the
+# non-chat endpoints start without paying for the LLM stack.
 
 import os
 import re
+import time
 import logging
-from sqlalchemy import create_engine, text, inspect
-from langchain_groq import ChatGroq
-from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import RunnablePassthrough, RunnableSequence
-from langchain_core.output_parsers import StrOutputParser
-import pandas as pd
+import threading
+from sqlalchemy import text
 from dotenv import load_dotenv
+from . import retrieval, schema_info
+from .sql_cache import SQLCache
+from .result_cache import ResultCache
+from . import answers, columnar, data_version, formatter, governor, index_advisor, intents
+from . import metrics, tracing
+from .llm_executor import ExecutorBusy, executor
+from .database import readonly_engine
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -18,12 +26,6 @@ logger = logging.getLogger(__name__)
 # Load .env variables
 load_dotenv()
 
-# === ✅ Database Configuration ===
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "../sql_app.db")
-DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DB_PATH}")
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-
 # === ✅ Data Dictionary with Detailed Schema ===
 DATA_DICTIONARY = """
 You are an intelligent assistant for an e-commerce platform. Answer user queries using the following EXACT table schemas:
@@ -35,11 +37,20 @@ You are an intelligent assistant for an e-commerce platform. Answer user queries
 5. products: [id, cost, category, name, brand, retail_price, department, sku, distribution_center_id]
 6. users: [id, first_name, last_name, email, age, gender, state, street_address, postal_code, city, country, latitude, longitude, traffic_source, created_at]
 
+Precomputed summary tables (far smaller — PREFER them for aggregate questions):
+7. daily_product_sales: [day, product_id, product_name, category, brand, department, items_sold, items_returned, revenue]  -- one row per product per day of order_items.created_at; revenue = sum of products.retail_price
+8. daily_category_sales: [day, category, department, items_sold, items_returned, revenue]  -- daily_product_sales rolled up by category/department
+9. inventory_by_distribution_center: [distribution_center_id, product_category, total_items, in_stock_items, sold_items, in_stock_cost]  -- inventory_items grouped by product_distribution_center_id and product_category
+10. order_status_counts: [status, order_count]  -- number of orders per status
+
 CRITICAL NOTES:
 - The 'products' table has 'name' NOT 'product_name'
 - Use 'products.name' for product names
 - 'inventory_items.product_name' is historical name at time of inventory creation
 - For current product names, ALWAYS use 'products.name'
+- Sales/returns by product, category, brand or department, top sellers and revenue: use daily_product_sales / daily_category_sales (SUM over days)
+- Stock per distribution center: use inventory_by_distribution_center (join distribution_centers on id = distribution_center_id)
+- Order counts by status: use order_status_counts
 
 Important Instructions:
 - Use JOINs where necessary
@@ -50,21 +61,18 @@ Important Instructions:
 """
 
 # === ✅ LLM Configuration ===
-llm = ChatGroq(
-    temperature=0.1,
-    model_name="llama3-70b-8192",
-    api_key=os.environ["GROQ_API_KEY"]
-)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")  # "stub" = offline, see stub_llm
+LLM_MODEL = os.getenv("LLM_MODEL", "llama3-70b-8192")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.1"))
 
 # === ✅ Prompt Templates ===
-SQL_PROMPT = PromptTemplate(
-    template="""
+SQL_TEMPLATE = """
 {data_dictionary}
 
 Database Schema:
 {table_info}
 
-Instructions:
+{examples}Instructions:
 1. Generate ONLY the SQL query
 2. Use SQLite syntax
 3. Be precise with table/column names
@@ -72,12 +80,9 @@ Instructions:
 
 Question: {question}
 SQL Query:
-""".strip(),
-    input_variables=["question", "table_info"]
-).partial(data_dictionary=DATA_DICTIONARY)
+""".strip()
 
-RESPONSE_PROMPT = PromptTemplate(
-    template="""
+RESPONSE_TEMPLATE = """
 {data_dictionary}
 
 Instructions:
@@ -91,38 +96,132 @@ SQL Used: {sql}
 Query Results: {result}
 
 Concise Response:
-""".strip(),
-    input_variables=["question", "sql", "result"]
-).partial(data_dictionary=DATA_DICTIONARY)
-
-# === ✅ Runnable Sequences ===
-# SQL generation sequence
-sql_sequence = RunnableSequence(
-    RunnablePassthrough.assign(table_info=lambda x: get_table_info()),
-    SQL_PROMPT,
-    llm,
-    StrOutputParser()
-)
-
-# Response generation sequence
-response_sequence = RunnableSequence(
-    RESPONSE_PROMPT,
-    llm,
-    StrOutputParser()
-)
+""".strip()
+
+# === ✅ Lazily Built LLM and Runnable Sequences ===
+llm = None
+sql_sequence = None       # SQL generation sequence
+response_sequence = None  # Response generation sequence
+_init_lock = threading.Lock()
+
+def build_llm():
+    if LLM_PROVIDER == "stub":
+        from .stub_llm import StubChatModel
+        return StubChatModel()
+
+    from langchain_groq import ChatGroq
+
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise RuntimeError("GROQ_API_KEY is not set")
+    return ChatGroq(
+        temperature=LLM_TEMPERATURE,
+        model_name=LLM_MODEL,
+        api_key=api_key
+    )
+
+def init_chains():
+    """Import langchain and build the LLM + sequences once (thread-safe)"""
+    global llm, sql_sequence, response_sequence
+    if sql_sequence is not None and response_sequence is not None:
+        return
+    with _init_lock:
+        if sql_sequence is not None and response_sequence is not None:
+            return
+        from langchain_core.prompts import PromptTemplate
+        from langchain_core.runnables import RunnableLambda, RunnableSequence
+        from langchain_core.output_parsers import StrOutputParser
+
+        if llm is None:
+            llm = build_llm()
+            llm.callbacks = [tracing.token_counter()]
+        sql_prompt = PromptTemplate(
+            template=SQL_TEMPLATE,
+            input_variables=["question", "data_dictionary", "table_info", "examples"]
+        )
+        response_prompt = PromptTemplate(
+            template=RESPONSE_TEMPLATE,
+            input_variables=["question", "sql", "result"]
+        ).partial(data_dictionary=DATA_DICTIONARY)
+
+        if sql_sequence is None:
+            sql_sequence = RunnableSequence(
+                RunnableLambda(lambda x: {**x, **sql_context(x["question"])}),
+                sql_prompt,
+                llm,
+                StrOutputParser()
+            )
+        if response_sequence is None:
+            response_sequence = RunnableSequence(
+                response_prompt,
+                llm,
+                StrOutputParser()
+            )
+
+def get_sql_sequence():
+    init_chains()
+    return sql_sequence
+
+def get_response_sequence():
+    init_chains()
+    return response_sequence
+
+def warmup():
+    """Build the chains, schema text and DB pool ahead of the first chat turn"""
+    started = time.perf_counter()
+    init_chains()
+    get_table_info()
+    data_version.generation(readonly_engine)
+    logger.info(f"LLM chain warm-up took {time.perf_counter() - started:.2f}s")
+
+# Question → SQL cache (see sql_cache); keyed on the schema fingerprint
+sql_cache = SQLCache()
+# Executed results, invalidated when load_data bumps the data generation
+result_cache = ResultCache()
+
+def cache_stats():
+    return {"sql_cache": sql_cache.stats(), "result_cache": result_cache.stats()}
+
+def _cache_gauge(field):
+    return lambda: [
+        ({"cache": "sql"}, sql_cache.stats()["size" if field == "entries" else field]),
+        ({"cache": "result"}, result_cache.stats()[field]),
+    ]
+
+for _field in ("hits", "misses", "evictions", "entries"):
+    metrics.register_gauge(f"cache_{_field}", _cache_gauge(_field))
 
 # === ✅ Helper Functions ===
 def get_table_info():
-    """Get detailed schema information"""
-    inspector = inspect(engine)
-    table_info = []
-    
-    for table_name in inspector.get_table_names():
-        columns = inspector.get_columns(table_name)
-        column_info = ", ".join([f"{col['name']} ({col['type']})" for col in columns])
-        table_info.append(f"Table: {table_name}\nColumns: {column_info}")
-    
-    return "\n\n".join(table_info)
+    """Schema text for the analytical tables (cached, see schema_info)"""
+    with tracing.span("table_info"):
+        return schema_info.get_table_info(readonly_engine)
+
+def sql_context(question):
+    """Dictionary, schema text and examples for the SQL prompt.
+
+    Only the tables, columns and examples relevant to the question (see
+    retrieval); the full dictionary and schema when retrieval is off or
+    nothing matches.
+    """
+    table_info = get_table_info()
+    if retrieval.SQL_RETRIEVAL:
+        with tracing.span("retrieval"):
+            index = retrieval.get_index(
+                schema_info.get_columns(readonly_engine), DATA_DICTIONARY,
+                schema_info.schema_fingerprint(readonly_engine),
+            )
+            selected = index.select(question)
+        if selected is not None:
+            tables, columns, examples = selected
+            tracing.annotate(tables=tables)
+            return {
+                "data_dictionary": index.render_dictionary(tables),
+                "table_info": schema_info.render_columns(columns),
+                "examples": retrieval.render_examples(examples),
+            }
+        metrics.incr("retrieval_fallback")
+    return {"data_dictionary": DATA_DICTIONARY, "table_info": table_info, "examples": ""}
 
 def clean_sql(sql: str) -> str:
     """Extract clean SQL query"""
@@ -145,54 +244,207 @@ def validate_sql(sql: str) -> bool:
         
     return True
 
-# === ✅ Core Query Function ===
-def run_query(question: str) -> str:
-    """Generate precise, concise responses to user queries"""
+# === ✅ Pipeline Stages ===
+FALLBACK_REPLY = "I need more details to answer that. Could you please rephrase?"
+CLARIFY_REPLY = "I need to clarify something about our data. Could you rephrase your question?"
+
+def generate_sql(question: str, cache_key: str = None):
+    """Step 1: return (sql_query, cached) or (None, direct reply).
+
+    The statement is returned as generated (the governor's LIMIT is added by
+    execute_generated) and looked up in the SQL cache under `cache_key`,
+    which defaults to the question.
+    """
+    with tracing.span("sql_cache"):
+        schema_version = schema_info.schema_fingerprint(readonly_engine)
+        sql_query = sql_cache.get(cache_key or question, schema_version)
+    if sql_query is not None:
+        logger.info(f"Cached SQL: {sql_query}")
+        return sql_query, True
+
+    with tracing.span("llm_sql"):
+        raw_sql = executor.invoke("sql", get_sql_sequence(), {"question": question})
+    logger.info(f"Raw SQL: {raw_sql}")
+
+    # Handle clarification requests
+    if "CLARIFY:" in raw_sql:
+        return None, raw_sql.replace("CLARIFY:", "").strip()
+
+    # Clean and validate SQL
+    sql_query = clean_sql(raw_sql)
+    logger.info(f"Clean SQL: {sql_query}")
+
+    if not validate_sql(sql_query):
+        return None, CLARIFY_REPLY
+    return sql_query, False
+
+def execute_sql(sql_query: str):
+    """Step 2: return a bounded QueryResult, skipping execution on a cache hit"""
+    generation = data_version.generation(readonly_engine)
+    cached = result_cache.get(sql_query, generation)
+    if cached is not None:
+        logger.info("Result cache hit")
+        tracing.annotate(result_cached=True)
+        return cached
+    with tracing.span("sql_execute"):
+        qr = columnar.execute(sql_query, generation)
+        if qr is None:
+            qr = execute_sqlite(sql_query)
+    result_cache.put(sql_query, generation, qr)
+    return qr
+
+def execute_generated(cache_key: str, sql_query: str, cached: bool):
+    """execute_sql for generate_sql's statement under the governor's LIMIT.
+    New SQL is cached (as generated, without that LIMIT) only once it has run;
+    a cached statement that fails (or is refused) is dropped."""
+    schema_version = schema_info.schema_fingerprint(readonly_engine)
+    try:
+        qr = execute_sql(governor.ensure_limit(sql_query))
+    except Exception:
+        if cached:
+            sql_cache.discard(cache_key, schema_version)
+        raise
+    if not cached:
+        sql_cache.put(cache_key, schema_version, sql_query)
+    return qr
+
+def execute_sqlite(sql_query: str):
+    """Run a statement on the read-only SQLite pool under the governor"""
+    with readonly_engine.connect() as conn:
+        plan = index_advisor.explain(conn, sql_query)
+        try:
+            governor.check_plan(conn, plan, index_advisor.table_aliases(sql_query))
+        except governor.QueryRejected:
+            index_advisor.record(sql_query, plan, None, None)
+            raise
+        started = time.perf_counter()
+        with governor.deadline(conn):
+            qr = formatter.collect(conn.execute(text(sql_query)), cap=governor.MAX_RESULT_ROWS)
+        duration_ms = (time.perf_counter() - started) * 1000
+    tracing.slow_query(sql_query, duration_ms, qr.row_count, plan)
+    index_advisor.record(sql_query, plan, duration_ms, qr.row_count)
+    return qr
+
+def format_result(qr) -> str:
+    result_str = formatter.render(qr)
+    logger.info(f"Results: {result_str[:100]}...")
+    return result_str
+
+def extract_response(response: str) -> str:
+    """Extract just the concise response"""
+    return response.split("Concise Response:")[-1].strip()
+
+# === ✅ Core Query Functions ===
+def run_query(question: str, message: str = None, cache_key: str = None) -> str:
+    """Generate precise, concise responses to user queries.
+
+    `message` is the user's latest message on its own (`question` may carry
+    the conversation history); it is tried against the intent router first.
+    `cache_key` is what the SQL cache is keyed on (default: the question);
+    callers pass the bare message when there is no history to depend on.
+    """
     try:
         logger.info(f"Question: {question}")
-        
-        # Step 1: Generate SQL
-        raw_sql = sql_sequence.invoke({"question": question})
-        logger.info(f"Raw SQL: {raw_sql}")
-        
-        # Handle clarification requests
-        if "CLARIFY:" in raw_sql:
-            return raw_sql.replace("CLARIFY:", "").strip()
-        
-        # Clean and validate SQL
-        sql_query = clean_sql(raw_sql)
-        logger.info(f"Clean SQL: {sql_query}")
-        
-        if not validate_sql(sql_query):
-            return "I need to clarify something about our data. Could you rephrase your question?"
-        
-        # Step 2: Execute SQL
-        with engine.connect() as conn:
-            result = conn.execute(text(sql_query))
-            columns = result.keys()
-            rows = result.fetchall()
-        
-        # Format results
-        if rows:
-            df = pd.DataFrame(rows, columns=columns)
-            result_str = df.to_markdown(index=False)
-        else:
-            result_str = "No results found"
-        logger.info(f"Results: {result_str[:100]}...")
-        
-        # Step 3: Generate concise response
-        response = response_sequence.invoke({
-            "question": question,
-            "sql": sql_query,
-            "result": result_str
-        })
-        
-        # Extract just the concise response
-        final_response = response.split("Concise Response:")[-1].strip()
+
+        with tracing.span("intent"):
+            routed = intents.route(message or question)
+        if routed is not None:
+            tracing.annotate(path="intent")
+            return routed
+
+        cache_key = cache_key or question
+        sql_query, cached = generate_sql(question, cache_key)
+        if sql_query is None:
+            return cached
+
+        qr = execute_generated(cache_key, sql_query, cached)
+
+        # Step 3: Answer small results locally, otherwise ask the LLM
+        with tracing.span("render"):
+            rendered = answers.render(message or question, qr)
+        if rendered is not None:
+            tracing.annotate(path="template")
+            return rendered
+        with tracing.span("format"):
+            result_str = format_result(qr)
+
+        with tracing.span("llm_response"):
+            response = executor.invoke("response", get_response_sequence(), {
+                "question": question,
+                "sql": sql_query,
+                "result": result_str
+            })
+        tracing.annotate(path="llm")
+        final_response = extract_response(response)
         logger.info(f"Final Response: {final_response}")
-        
+
         return final_response
-    
+
+    except (governor.GovernorError, ExecutorBusy) as e:
+        metrics.incr("declined", type=type(e).__name__)
+        logger.warning(f"Declined: {e}")
+        tracing.annotate(path="declined", error=type(e).__name__)
+        return str(e)
+
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        tracing.annotate(path="fallback", error=f"{type(e).__name__}: {e}")
+        return FALLBACK_REPLY
+
+def stream_query(question: str, message: str = None, cache_key: str = None):
+    """Same pipeline as run_query, yielding (event, payload) per stage.
+
+    Events: sql, executed, token (one per LLM chunk) and finally answer.
+    """
+    try:
+        logger.info(f"Question (stream): {question}")
+
+        with tracing.span("intent"):
+            routed = intents.route(message or question)
+        if routed is not None:
+            tracing.annotate(path="intent")
+            yield "answer", {"text": routed}
+            return
+
+        cache_key = cache_key or question
+        sql_query, cached = generate_sql(question, cache_key)
+        if sql_query is None:
+            yield "answer", {"text": cached}
+            return
+        yield "sql", {"sql": governor.ensure_limit(sql_query), "cached": cached}
+
+        qr = execute_generated(cache_key, sql_query, cached)
+        yield "executed", {"row_count": qr.row_count, "columns": list(qr.columns),
+                           "truncated": qr.truncated}
+        with tracing.span("render"):
+            rendered = answers.render(message or question, qr)
+        if rendered is not None:
+            tracing.annotate(path="template")
+            yield "answer", {"text": rendered}
+            return
+        with tracing.span("format"):
+            result_str = format_result(qr)
+
+        chunks = []
+        with tracing.span("llm_response"):
+            for chunk in executor.stream("response", get_response_sequence(), {
+                "question": question,
+                "sql": sql_query,
+                "result": result_str
+            }):
+                chunks.append(chunk)
+                yield "token", {"text": chunk}
+        tracing.annotate(path="llm")
+
+        final_response = extract_response("".join(chunks))
+        logger.info(f"Final Response: {final_response}")
+        yield "answer", {"text": final_response}
+
+    except (governor.GovernorError, ExecutorBusy) as e:
+        metrics.incr("declined", type=type(e).__name__)
+        logger.warning(f"Declined: {e}")
+        yield "answer", {"text": str(e)}
+
     except Exception as e:
         logger.error(f"Error: {str(e)}")
-        return "I need more details to answer that. Could you please rephrase?"
\ No newline at end of file
+        yield "answer", {"text": FALLBACK_REPLY}
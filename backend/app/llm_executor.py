@@ -0,0 +1,162 @@
+# backend/app/llm_executor.py
+#
+# Execution layer for the LLM calls made by llm_chain.
+#
+# - Bounded concurrency: at most LLM_MAX_CONCURRENCY calls are upstream at
+#   once; further callers queue for a slot (up to LLM_QUEUE_TIMEOUT_SECONDS).
+# - Rate limit: a token bucket keeps calls under LLM_RATE_PER_MINUTE
+#   (bursts of up to LLM_RATE_BURST); 0 disables it.
+# - Single-flight: a call whose prompt inputs match one already in flight
+#   waits for that call's result instead of going to the provider again.
+#
+# Queue depth, wait time and coalesced calls are exposed by stats() and
+# counted in metrics under llm_*.
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from . import metrics
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_RATE_PER_MINUTE = float(os.getenv("LLM_RATE_PER_MINUTE", "30"))
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "10"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "30"))
+
+
+class ExecutorBusy(RuntimeError):
+    """No LLM slot became free in time; str() is safe to show to the user"""
+
+
+class RateLimiter:
+    """Token bucket; acquire() blocks until a token is available"""
+
+    def __init__(self, per_minute, burst):
+        self.rate = per_minute / 60
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token; returns the seconds spent waiting"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            # a negative balance is this caller's place in line
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class LLMExecutor:
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, per_minute=LLM_RATE_PER_MINUTE,
+                 burst=LLM_RATE_BURST, queue_timeout=LLM_QUEUE_TIMEOUT_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.limiter = RateLimiter(per_minute, burst)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.queued = self.running = 0
+        self.calls = self.coalesced = self.rejected = 0
+        self.wait_ms_total = self.wait_ms_max = 0.0
+
+    @contextmanager
+    def slot(self, kind):
+        """Hold one upstream slot (and rate-limit token) for the duration"""
+        started = time.monotonic()
+        with self._lock:
+            self.queued += 1
+        acquired = self._slots.acquire(timeout=self.queue_timeout or None)
+        with self._lock:
+            self.queued -= 1
+        if not acquired:
+            with self._lock:
+                self.rejected += 1
+            metrics.incr("llm_rejected", kind=kind)
+            raise ExecutorBusy("We're handling a lot of questions right now. "
+                               "Please try again in a moment.")
+        try:
+            self.limiter.acquire()
+            wait_ms = (time.monotonic() - started) * 1000
+            with self._lock:
+                self.running += 1
+                self.calls += 1
+                self.wait_ms_total += wait_ms
+                self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+            metrics.incr("llm_calls", kind=kind)
+            metrics.incr("llm_wait_ms", wait_ms, kind=kind)
+            metrics.observe("llm_queue_wait_seconds", wait_ms / 1000, kind=kind)
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self.running -= 1
+        finally:
+            self._slots.release()
+
+    def invoke(self, kind, runnable, inputs):
+        """runnable.invoke(inputs), shared with any identical call in flight"""
+        key = (kind, json.dumps(inputs, sort_keys=True, default=str))
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if not leader:
+            metrics.incr("llm_coalesced", kind=kind)
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            with self.slot(kind):
+                flight.result = runnable.invoke(inputs)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stream(self, kind, runnable, inputs):
+        """runnable.stream(inputs) holding a slot until the stream ends"""
+        with self.slot(kind):
+            yield from runnable.stream(inputs)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "running": self.running,
+                "queued": self.queued,
+                "in_flight_prompts": len(self._flights),
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected,
+                "wait_ms_avg": self.wait_ms_total / self.calls if self.calls else 0.0,
+                "wait_ms_max": self.wait_ms_max,
+            }
+
+
+executor = LLMExecutor()
+metrics.register_gauge("llm_queue_depth", lambda: executor.queued)
+metrics.register_gauge("llm_running", lambda: executor.running)
@@ -1,110 +1,220 @@
 # backend/app/load_data.py
+#
+# Bulk CSV loader: reads each CSV in fixed-size chunks, coerces/filters the
+# chunk with vectorized pandas ops and upserts it with one executemany per
+# chunk inside a single transaction per table. Peak memory is bounded by
+# LOAD_CHUNK_SIZE (plus the set of seen user emails). Each table's data
+# version is bumped in the same transaction, invalidating cached results.
+#
+#   python -m app.load_data
 
 import os
+import time
+import numpy as np
 import pandas as pd
-from datetime import datetime
-from .database import SessionLocal, Base, engine
+from sqlalchemy import inspect as sa_inspect
+from .database import Base, engine
+from . import columnar, data_version, rollups, schema_info
 from .models import (
     DistributionCenter, Product,
     InventoryItem, Order, OrderItem, User
 )
 
-# 1) Create tables if not exist
-Base.metadata.create_all(bind=engine)
-session = SessionLocal()
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(BASE_DIR, "../data"))
+CHUNK_SIZE = int(os.getenv("LOAD_CHUNK_SIZE", "50000"))
 
-def parse_dt(x):
-    if pd.isna(x) or x == "":
-        return None
-    try:
-        return datetime.fromisoformat(x)
-    except:
-        return None
-
-# track seen emails
-existing_emails = set()
-
-# 2) Configuration: model, CSV, converters, required, dedupe
+# 1) Configuration: model, CSV, column types, required, dedupe
 mappings = [
     (
         DistributionCenter, 'distribution_centers.csv',
-        {'id':int, 'name':str, 'latitude':float, 'longitude':float},
+        {'id':'int', 'name':'str', 'latitude':'float', 'longitude':'float'},
         ['id','name'], False
     ),
     (
         Product, 'products.csv',
-        {'id':int,'cost':float,'category':str,'name':str,'brand':str,
-         'retail_price':float,'department':str,'sku':str,
-         'distribution_center_id':int},
+        {'id':'int','cost':'float','category':'str','name':'str','brand':'str',
+         'retail_price':'float','department':'str','sku':'str',
+         'distribution_center_id':'int'},
         ['id','name'], False
     ),
     (
         InventoryItem, 'inventory_items.csv',
-        {'id':int,'product_id':int,'created_at':parse_dt,'sold_at':parse_dt,
-         'cost':float,'product_category':str,'product_name':str,
-         'product_brand':str,'product_retail_price':float,
-         'product_department':str,'product_sku':str,
-         'product_distribution_center_id':int},
+        {'id':'int','product_id':'int','created_at':'datetime','sold_at':'datetime',
+         'cost':'float','product_category':'str','product_name':'str',
+         'product_brand':'str','product_retail_price':'float',
+         'product_department':'str','product_sku':'str',
+         'product_distribution_center_id':'int'},
         ['id','product_id'], False
     ),
     (
         Order, 'orders.csv',
-        {'order_id':int,'user_id':int,'status':str,'gender':str,
-         'created_at':parse_dt,'returned_at':parse_dt,
-         'shipped_at':parse_dt,'delivered_at':parse_dt,
-         'num_of_item':int},
+        {'order_id':'int','user_id':'int','status':'str','gender':'str',
+         'created_at':'datetime','returned_at':'datetime',
+         'shipped_at':'datetime','delivered_at':'datetime',
+         'num_of_item':'int'},
         ['order_id','user_id'], False
     ),
     (
         OrderItem, 'order_items.csv',
-        {'id':int,'order_id':int,'user_id':int,'product_id':int,
-         'inventory_item_id':int,'status':str,'created_at':parse_dt,
-         'shipped_at':parse_dt,'delivered_at':parse_dt,'returned_at':parse_dt},
+        {'id':'int','order_id':'int','user_id':'int','product_id':'int',
+         'inventory_item_id':'int','status':'str','created_at':'datetime',
+         'shipped_at':'datetime','delivered_at':'datetime','returned_at':'datetime'},
         ['id','order_id'], False
     ),
     (
         User, 'users.csv',
-        {'id':int,'first_name':str,'last_name':str,'email':str,'age':int,
-         'gender':str,'state':str,'street_address':str,'postal_code':str,
-         'city':str,'country':str,'latitude':float,'longitude':float,
-         'traffic_source':str,'created_at':parse_dt},
+        {'id':'int','first_name':'str','last_name':'str','email':'str','age':'int',
+         'gender':'str','state':'str','street_address':'str','postal_code':'str',
+         'city':'str','country':'str','latitude':'float','longitude':'float',
+         'traffic_source':'str','created_at':'datetime'},
         ['id','email'], True       # <— dedupe on email for User
     ),
 ]
 
-# 3) Process each CSV
-for Model, fname, conv, required, dedupe in mappings:
-    df = pd.read_csv(os.path.join('data', fname))
-    loaded = skipped = duped = 0
+# Keys each load reports to rollups.refresh() for incremental maintenance
+ROLLUP_KEYS = {
+    'order_items': 'created_at',                          # → affected days
+    'inventory_items': 'product_distribution_center_id',  # → affected DCs
+}
+
+# 2) Vectorized chunk processing
 
-    for _, row in df.iterrows():
-        # build kwargs
-        kwargs = {}
-        for col, fn in conv.items():
-            val = row.get(col, None)
-            if pd.isna(val):
-                val = None
-            kwargs[col] = fn(val) if val is not None else None
-
-        # skip if any required missing/blank
-        if any(kwargs.get(r) in (None, "", 0) for r in required):
-            skipped += 1
+def coerce(df, conv):
+    """Cast every configured column; unparseable cells become null"""
+    out = pd.DataFrame(index=df.index)
+    for col, kind in conv.items():
+        if col not in df:
+            out[col] = None
             continue
+        s = df[col]
+        if kind == 'int':
+            out[col] = np.trunc(pd.to_numeric(s, errors='coerce')).astype('Int64')
+        elif kind == 'float':
+            out[col] = pd.to_numeric(s, errors='coerce')
+        elif kind == 'datetime':
+            dt = pd.to_datetime(s, errors='coerce', utc=True, format='ISO8601')
+            out[col] = dt.dt.tz_localize(None)
+        else:
+            out[col] = s.where(s.notna(), None)
+    return out
+
+def required_mask(df, required):
+    """True for rows where every required field is present and non-blank/zero"""
+    ok = pd.Series(True, index=df.index)
+    for col in required:
+        ok &= df[col].notna().to_numpy(dtype=bool)
+        ok &= ~df[col].isin(["", 0]).fillna(False).to_numpy(dtype=bool)
+    return ok
+
+def dedupe_mask(emails, seen):
+    """True for emails not seen in this chunk or any earlier one"""
+    keep = ~(emails.duplicated() | emails.isin(seen))
+    seen.update(emails[keep])
+    return keep
+
+def rollup_keys(df, col):
+    """Distinct rollup keys touched by a chunk"""
+    if col == 'created_at':
+        return set(df[col].dropna().dt.strftime('%Y-%m-%d').unique())
+    return {int(v) for v in df[col].fillna(0).unique()}
+
+def to_records(df):
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+def upsert_statement(Model):
+    """INSERT ... ON CONFLICT(pk) DO UPDATE, i.e. session.merge() semantics"""
+    if engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    table = Model.__table__
+    pk = [c.name for c in sa_inspect(Model).primary_key]
+    stmt = insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=pk,
+        set_={c.name: stmt.excluded[c.name] for c in table.columns if c.name not in pk},
+    )
+
+# 3) Per-table load
+
+def load_table(conn, Model, path, conv, required, dedupe, seen_emails,
+               chunksize=CHUNK_SIZE):
+    """Load one CSV; returns (loaded, skipped, duped, rollup keys or None)"""
+    stmt = upsert_statement(Model)
+    key_col = ROLLUP_KEYS.get(Model.__tablename__)
+    keys = set() if key_col else None
+    str_cols = [c for c, kind in conv.items() if kind == 'str']
+    loaded = skipped = duped = 0
+    reader = pd.read_csv(
+        path, chunksize=chunksize,
+        usecols=lambda c: c in conv, dtype={c: str for c in str_cols},
+    )
+    for chunk in reader:
+        df = coerce(chunk, conv)
+
+        keep = required_mask(df, required)
+        skipped += int((~keep).sum())
+        df = df[keep]
 
-        # additional dedupe for users by email
         if dedupe:
-            email = kwargs.get('email')
-            if email in existing_emails:
-                duped += 1
-                continue
-            existing_emails.add(email)
+            keep = dedupe_mask(df['email'], seen_emails)
+            duped += int((~keep).sum())
+            df = df[keep]
 
-        # upsert
-        session.merge(Model(**kwargs))
-        loaded += 1
+        if len(df):
+            conn.execute(stmt, to_records(df))
+            loaded += len(df)
+            if key_col:
+                keys |= rollup_keys(df, key_col)
+    return loaded, skipped, duped, keys
 
-    session.commit()
-    print(f"{fname}: loaded {loaded}, skipped {skipped}" + (f", duped {duped}" if dedupe else ""))
+def load_all(data_dir=DATA_DIR, chunksize=CHUNK_SIZE):
+    Base.metadata.create_all(bind=engine)
+    seen_emails = set()
+    stats = {}
+    changes = {}
+    for Model, fname, conv, required, dedupe in mappings:
+        path = os.path.join(data_dir, fname)
+        if not os.path.exists(path):
+            print(f"{fname}: missing, skipped")
+            continue
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            loaded, skipped, duped, keys = load_table(
+                conn, Model, path, conv, required, dedupe, seen_emails, chunksize
+            )
+            data_version.bump(conn, [Model.__tablename__])
+        elapsed = time.perf_counter() - started
+        if loaded:
+            changes[Model.__tablename__] = keys
+        rate = loaded / elapsed if elapsed else 0.0
+        stats[Model.__tablename__] = {
+            'loaded': loaded, 'skipped': skipped, 'duped': duped,
+            'seconds': elapsed, 'rows_per_sec': rate,
+        }
+        print(f"{fname}: loaded {loaded}, skipped {skipped}"
+              + (f", duped {duped}" if dedupe else "")
+              + f" in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    # 4) Incrementally refresh the rollup tables
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        refreshed = rollups.refresh(conn, changes)
+    if refreshed:
+        print(f"rollups: refreshed {', '.join(refreshed)} "
+              f"in {time.perf_counter() - started:.2f}s")
+    # 5) Columnar snapshot for the analytical engine
+    if columnar.enabled():
+        if columnar.available():
+            started = time.perf_counter()
+            written = columnar.export_snapshot(engine)
+            print(f"snapshot: {len(written)} tables to Parquet "
+                  f"in {time.perf_counter() - started:.2f}s")
+        else:
+            print("snapshot: ANALYTICS_ENGINE=duckdb but duckdb is not installed, skipped")
+    schema_info.invalidate()
+    print("✅ Data load complete.")
+    return stats
 
-session.close()
-print("✅ Data load complete.")
+if __name__ == '__main__':
+    load_all()
@@ -0,0 +1,234 @@
+# backend/app/loadtest.py
+#
+# End-to-end load harness. Drives a weighted mix of every endpoint in app.py
+# (catalog pages and NDJSON streams, users, conversations, messages,
+# /api/chat, /api/chat/stream, history lookups) from --concurrency worker
+# threads, then reports throughput, error counts and p50/p95/p99 latency per
+# scenario.
+#
+# By default the app runs in-process with the offline stub LLM
+# (LLM_PROVIDER=stub, no rate limit), so runs are reproducible without network
+# access. --url targets a running server instead.
+#
+#   python -m app.datagen --scale 1 --out /tmp/data1
+#   DATA_DIR=/tmp/data1 DATABASE_URL=sqlite:////tmp/load.db python -m app.load_data
+#   DATABASE_URL=sqlite:////tmp/load.db python -m app.loadtest --requests 2000 --concurrency 16
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+CATALOG = ["distribution_centers", "products", "inventory_items", "orders", "order_items"]
+QUESTIONS = [
+    "Where is order {order_id}?",
+    "What is the price of product {product_id}?",
+    "How many items are in stock at Chicago IL?",
+    "How many orders are there?",
+    "What were sales by category?",
+    "How many users come from each traffic source?",
+    "List all products",
+    "What is the status breakdown of orders?",
+]
+SCENARIOS = [  # (name, weight)
+    ("catalog_page", 30),
+    ("catalog_stream", 3),
+    ("create_user", 2),
+    ("conversation", 5),
+    ("chat", 35),
+    ("chat_stream", 10),
+    ("history", 15),
+]
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+class InProcessClient:
+    def __init__(self):
+        from .app import app
+        self._app = app
+
+    def request(self, method, path, body=None):
+        client = self._app.test_client()
+        resp = client.open(path, method=method, json=body)
+        return resp.status_code, resp.get_data()
+
+
+class HTTPClient:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=120) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+class LoadTest:
+    def __init__(self, client, seed=42, max_ids=None):
+        self.client = client
+        self.rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.max_ids = max_ids or {"users": 1000, "orders": 1000, "products": 100}
+        self.conversations = []
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    # — helpers —
+
+    def _pick(self, fn, *args):
+        with self._rng_lock:
+            return fn(*args)
+
+    def _call(self, method, path, body=None):
+        status, data = self.client.request(method, path, body)
+        if status >= 400:
+            raise RuntimeError(f"{method} {path} -> {status}")
+        return data
+
+    def _json(self, method, path, body=None):
+        return json.loads(self._call(method, path, body))
+
+    def _user(self):
+        return self._pick(self.rng.randint, 1, self.max_ids["users"])
+
+    def _question(self):
+        template = self._pick(self.rng.choice, QUESTIONS)
+        return template.format(
+            order_id=self._pick(self.rng.randint, 1, self.max_ids["orders"]),
+            product_id=self._pick(self.rng.randint, 1, self.max_ids["products"]),
+        )
+
+    # — scenarios —
+
+    def catalog_page(self):
+        table = self._pick(self.rng.choice, CATALOG)
+        self._json("GET", f"/api/{table}?limit=50&after={self._pick(self.rng.randint, 0, 500)}")
+
+    def catalog_stream(self):
+        table = self._pick(self.rng.choice, CATALOG)
+        self._call("GET", f"/api/{table}?stream=1&limit=500")
+
+    def create_user(self):
+        suffix = f"{time.time_ns()}{threading.get_ident()}"
+        self._json("POST", "/api/users", {"email": f"load.{suffix}@example.com",
+                                          "first_name": "Load", "last_name": "Test"})
+
+    def conversation(self):
+        conv = self._json("POST", "/api/conversations", {"user_id": self._user()})
+        self._json("POST", f"/api/conversations/{conv['id']}/messages",
+                   {"sender": "user", "content": "hello"})
+        self._json("GET", f"/api/conversations/{conv['id']}/messages")
+
+    def chat(self):
+        with self._lock:
+            conv = self._pick(self.rng.choice, self.conversations) if self.conversations else None
+        body = {"user_id": conv[0] if conv else self._user(), "message": self._question()}
+        if conv:
+            body["conversation_id"] = conv[1]
+        out = self._json("POST", "/api/chat", body)
+        with self._lock:
+            if len(self.conversations) < 200:
+                self.conversations.append((body["user_id"], out["conversation_id"]))
+
+    def chat_stream(self):
+        data = self._call("POST", "/api/chat/stream",
+                          {"user_id": self._user(), "message": self._question()})
+        if b"event: answer" not in data:
+            raise RuntimeError("stream ended without an answer event")
+
+    def history(self):
+        with self._lock:
+            conv = self._pick(self.rng.choice, self.conversations) if self.conversations else None
+        if conv is None:
+            self._json("GET", f"/api/conversations?user_id={self._user()}")
+            return
+        self._json("GET", f"/api/conversations?user_id={conv[0]}")
+        self._json("GET", f"/api/messages?conversation_id={conv[1]}")
+
+    # — driver —
+
+    def run_one(self):
+        names, weights = zip(*SCENARIOS)
+        name = self._pick(self.rng.choices, names, weights)[0]
+        started = time.perf_counter()
+        try:
+            getattr(self, name)()
+        except Exception:
+            with self._lock:
+                self.errors[name] += 1
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.samples[name].append(elapsed)
+
+    def run(self, requests, concurrency):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for _ in range(requests):
+                pool.submit(self.run_one)
+        return time.perf_counter() - started
+
+    def report(self, elapsed):
+        total = sum(len(v) for v in self.samples.values())
+        print(f"{'scenario':<16}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        rows = sorted(self.samples.items()) + [("all", [s for v in self.samples.values() for s in v])]
+        for name, values in rows:
+            values = sorted(values)
+            errors = sum(self.errors.values()) if name == "all" else self.errors[name]
+            print(f"{name:<16}{len(values):>7}{errors:>8}"
+                  f"{percentile(values, 50):>10.1f}{percentile(values, 95):>10.1f}"
+                  f"{percentile(values, 99):>10.1f}")
+        print(f"\n{total} scenarios in {elapsed:.1f}s — {total / elapsed:.1f} scenarios/s")
+
+
+def max_ids():
+    """Highest user/order/product ids in the database the in-process app uses"""
+    from sqlalchemy import func, select
+    from .database import engine
+    from .models import Order, Product, User
+
+    with engine.connect() as conn:
+        return {
+            "users": conn.execute(select(func.max(User.id))).scalar() or 1,
+            "orders": conn.execute(select(func.max(Order.order_id))).scalar() or 1,
+            "products": conn.execute(select(func.max(Product.id))).scalar() or 1,
+        }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test every endpoint of the app")
+    parser.add_argument("--requests", type=int, default=1000, help="scenarios to run")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--url", help="target a running server instead of in-process")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    if args.url:
+        test = LoadTest(HTTPClient(args.url), args.seed)
+    else:
+        os.environ.setdefault("LLM_PROVIDER", "stub")
+        os.environ.setdefault("LLM_RATE_PER_MINUTE", "0")
+        os.environ.setdefault("LLM_MAX_CONCURRENCY", str(args.concurrency))
+        test = LoadTest(InProcessClient(), args.seed, max_ids())
+    elapsed = test.run(args.requests, args.concurrency)
+    test.report(elapsed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# backend/app/memory.py
+#
+# Rolling per-conversation memory for the chat prompt.
+#
+# Each conversation keeps a window of the most recent messages plus a running
+# summary of everything older, persisted in `conversation_memories`. When the
+# window exceeds its share of MEMORY_TOKEN_BUDGET the oldest messages are
+# folded into the summary (one truncated line each, oldest lines dropped once
+# the summary is over MEMORY_SUMMARY_TOKENS). Folding is extractive, so
+# updating memory costs no LLM call and the rendered history stays bounded
+# no matter how long the conversation runs.
+
+import datetime
+import json
+import os
+from .models import ConversationMemory, Message
+
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1024"))
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "256"))
+MEMORY_LINE_CHARS = int(os.getenv("MEMORY_LINE_CHARS", "160"))
+
+
+def estimate_tokens(text):
+    """Cheap ~4 chars/token estimate, good enough for budgeting"""
+    return len(text) // 4 + 1
+
+def _line(sender, content):
+    return f"{sender}: {content}"
+
+def _fold(summary, sender, content):
+    """Append one condensed line to the summary and trim it to budget"""
+    text = " ".join(content.split())
+    if len(text) > MEMORY_LINE_CHARS:
+        text = text[:MEMORY_LINE_CHARS - 1] + "…"
+    lines = summary.splitlines() if summary else []
+    lines.append(_line(sender, text))
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > MEMORY_SUMMARY_TOKENS:
+        lines.pop(0)
+    return "\n".join(lines)
+
+def append(mem, sender, content):
+    """Add a message to the window, folding the oldest into the summary"""
+    window_budget = MEMORY_TOKEN_BUDGET - MEMORY_SUMMARY_TOKENS
+    if estimate_tokens(content) > window_budget:
+        content = content[:window_budget * 4] + "…"
+    window = json.loads(mem.window or "[]")
+    window.append([sender, content])
+    summary = mem.summary or ""
+    tokens = sum(estimate_tokens(_line(s, c)) for s, c in window)
+    while len(window) > 1 and tokens > window_budget:
+        s, c = window.pop(0)
+        tokens -= estimate_tokens(_line(s, c))
+        summary = _fold(summary, s, c)
+    mem.window = json.dumps(window)
+    mem.summary = summary
+    mem.token_count = tokens + (estimate_tokens(summary) if summary else 0)
+    mem.updated_at = datetime.datetime.utcnow()
+    return mem
+
+def new(conversation_id=None):
+    return ConversationMemory(conversation_id=conversation_id, summary="", window="[]")
+
+def load(sess, conversation_id):
+    """Memory row for the conversation, bootstrapped from its messages once"""
+    mem = sess.get(ConversationMemory, conversation_id)
+    if mem is not None:
+        return mem
+    mem = new(conversation_id)
+    history = (
+        sess.query(Message.sender, Message.content)
+            .filter(Message.conversation_id == conversation_id)
+            .order_by(Message.timestamp.asc())
+            .all()
+    )
+    for sender, content in history:
+        append(mem, sender, content)
+    sess.add(mem)
+    return mem
+
+def is_empty(mem):
+    """True when the memory holds no earlier messages"""
+    return not mem.summary and json.loads(mem.window or "[]") == []
+
+def preview(mem, message):
+    """History text as if `message` were appended, leaving `mem` untouched"""
+    draft = new(mem.conversation_id)
+    draft.summary, draft.window = mem.summary, mem.window
+    return render(append(draft, "user", message))
+
+def render(mem):
+    """History text for the prompt: summary of older turns + recent window"""
+    window = json.loads(mem.window or "[]")
+    recent = "\n".join(_line(s, c) for s, c in window)
+    if not mem.summary:
+        return recent
+    return f"Earlier in this conversation:\n{mem.summary}\n\nRecent messages:\n{recent}"
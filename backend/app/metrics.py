@@ -0,0 +1,115 @@
+# backend/app/metrics.py
+#
+# In-process metrics shared by the query pipeline (cache hits, governor
+# interventions, stage latencies, ...). Counters and histograms are keyed by
+# name plus optional labels; gauges are callbacks sampled at scrape time.
+# render_prometheus() produces the text exposition served on /metrics.
+
+import logging
+import threading
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_histograms = {}  # key -> [buckets, per-bucket counts, sum, count]
+_gauges = {}      # name -> fn() returning a number or [(labels dict, number)]
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def incr(name, value=1, **labels):
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+def get(name, **labels):
+    with _lock:
+        return _counters.get(_key(name, labels), 0)
+
+def observe(name, value, buckets=DEFAULT_BUCKETS, **labels):
+    """Record one sample (seconds for latencies) in a histogram"""
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [buckets, [0] * len(buckets), 0.0, 0]
+        for i, bound in enumerate(h[0]):
+            if value <= bound:
+                h[1][i] += 1
+                break
+        h[2] += value
+        h[3] += 1
+
+def register_gauge(name, fn):
+    """Sample fn() on every scrape; it returns a number or [(labels, number)]"""
+    with _lock:
+        _gauges[name] = fn
+
+def snapshot():
+    """{(name, labels): value} copy of every counter"""
+    with _lock:
+        return dict(_counters)
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+# — Prometheus text format —
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    def escape(v):
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in pairs) + "}"
+
+def _number(v):
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+def render_prometheus(prefix="chatbot_"):
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((k, [h[0], list(h[1]), h[2], h[3]]) for k, h in _histograms.items())
+        gauges = sorted(_gauges.items())
+
+    lines = []
+    seen = set()
+    for (name, labels), value in counters:
+        metric = f"{prefix}{name}_total"
+        if metric not in seen:
+            seen.add(metric)
+            lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric}{_labels(labels)} {_number(value)}")
+
+    for (name, labels), (buckets, counts, total, count) in histograms:
+        metric = f"{prefix}{name}"
+        if metric not in seen:
+            seen.add(metric)
+            lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, n in zip(buckets, counts):
+            cumulative += n
+            lines.append(f"{metric}_bucket{_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{metric}_bucket{_labels(labels, [('le', '+Inf')])} {count}")
+        lines.append(f"{metric}_sum{_labels(labels)} {_number(total)}")
+        lines.append(f"{metric}_count{_labels(labels)} {count}")
+
+    for name, fn in gauges:
+        try:
+            value = fn()
+        except Exception as e:
+            logger.warning(f"Gauge {name} failed: {e}")
+            continue
+        metric = f"{prefix}{name}"
+        lines.append(f"# TYPE {metric} gauge")
+        samples = value if isinstance(value, list) else [({}, value)]
+        for labels, v in samples:
+            lines.append(f"{metric}{_labels(sorted(labels.items()))} {_number(v)}")
+    return "\n".join(lines) + "\n"
@@ -1,6 +1,6 @@
 # backend/app/models.py
 from sqlalchemy import (
-    Column, Integer, String, Float, ForeignKey, DateTime, Text
+    Column, Integer, String, Float, ForeignKey, Date, DateTime, Text, Index
 )
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -101,8 +101,13 @@ class Conversation(Base):
     user_id    = Column(Integer, ForeignKey('users.id'))
     started_at = Column(DateTime, default=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        Index('ix_conversations_user_started', 'user_id', 'started_at'),
+    )
+
     user     = relationship('User', back_populates='conversations')
     messages = relationship('Message', back_populates='conversation')
+    memory   = relationship('ConversationMemory', back_populates='conversation', uselist=False)
 
 class Message(Base):
     __tablename__ = 'messages'
@@ -112,4 +117,73 @@ class Message(Base):
     content         = Column(Text, nullable=False)
     timestamp       = Column(DateTime, default=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        Index('ix_messages_conversation_timestamp', 'conversation_id', 'timestamp'),
+        Index('ix_messages_conversation_id', 'conversation_id', 'id'),  # delta sync
+    )
+
     conversation = relationship('Conversation', back_populates='messages')
+
+# — Rollup tables (maintained by app.rollups after each load) —
+
+class DailyProductSales(Base):
+    __tablename__ = 'daily_product_sales'
+    day            = Column(Date, primary_key=True)
+    product_id     = Column(Integer, primary_key=True)
+    product_name   = Column(String)
+    category       = Column(String)
+    brand          = Column(String)
+    department     = Column(String)
+    items_sold     = Column(Integer, nullable=False, default=0)
+    items_returned = Column(Integer, nullable=False, default=0)
+    revenue        = Column(Float, nullable=False, default=0.0)   # sum of products.retail_price
+
+class DailyCategorySales(Base):
+    __tablename__ = 'daily_category_sales'
+    day            = Column(Date, primary_key=True)
+    category       = Column(String, primary_key=True)
+    department     = Column(String, primary_key=True)
+    items_sold     = Column(Integer, nullable=False, default=0)
+    items_returned = Column(Integer, nullable=False, default=0)
+    revenue        = Column(Float, nullable=False, default=0.0)
+
+class InventoryByDistributionCenter(Base):
+    __tablename__ = 'inventory_by_distribution_center'
+    distribution_center_id = Column(Integer, primary_key=True)
+    product_category       = Column(String, primary_key=True)
+    total_items            = Column(Integer, nullable=False, default=0)
+    in_stock_items         = Column(Integer, nullable=False, default=0)   # sold_at IS NULL
+    sold_items             = Column(Integer, nullable=False, default=0)
+    in_stock_cost          = Column(Float, nullable=False, default=0.0)
+
+class OrderStatusCount(Base):
+    __tablename__ = 'order_status_counts'
+    status      = Column(String, primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+
+class ConversationMemory(Base):
+    __tablename__ = 'conversation_memories'
+    conversation_id = Column(Integer, ForeignKey('conversations.id'), primary_key=True)
+    summary         = Column(Text, nullable=False, default="")
+    window          = Column(Text, nullable=False, default="[]")  # JSON [[sender, content], ...]
+    token_count     = Column(Integer, nullable=False, default=0)
+    updated_at      = Column(DateTime, default=datetime.datetime.utcnow)
+
+    conversation = relationship('Conversation', back_populates='memory')
+
+class DataVersion(Base):
+    __tablename__ = 'data_versions'
+    table_name = Column(String, primary_key=True)
+    version    = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class QueryStat(Base):
+    """Executed LLM statements aggregated by canonical SQL (see index_advisor)"""
+    __tablename__ = 'query_stats'
+    sql_hash    = Column(String, primary_key=True)  # sha1 of the canonical SQL
+    sql         = Column(Text, nullable=False)
+    plan        = Column(Text)          # EXPLAIN QUERY PLAN details, one per line
+    count       = Column(Integer, nullable=False, default=0)
+    total_ms    = Column(Float, nullable=False, default=0.0)
+    row_count   = Column(Integer)       # of the latest run
+    last_seen   = Column(DateTime, default=datetime.datetime.utcnow)
@@ -0,0 +1,28 @@
+# backend/app/notify.py
+#
+# In-process wake-ups for conversation views. Writers call publish() after
+# committing messages; long-poll and SSE readers block in wait() until a
+# conversation's newest message id passes their cursor (or the timeout ends,
+# after which they re-read the database anyway, so a writer in another
+# process is picked up at the next timeout rather than missed).
+
+import threading
+
+_cond = threading.Condition()
+_latest = {}  # conversation id -> newest message id published
+
+
+def publish(conversation_id, message_id):
+    with _cond:
+        if message_id > _latest.get(conversation_id, 0):
+            _latest[conversation_id] = message_id
+        _cond.notify_all()
+
+def latest(conversation_id):
+    with _cond:
+        return _latest.get(conversation_id, 0)
+
+def wait(conversation_id, after_id, timeout):
+    """Block until a message newer than after_id is published; True if one was"""
+    with _cond:
+        return _cond.wait_for(lambda: _latest.get(conversation_id, 0) > after_id, timeout)
@@ -0,0 +1,94 @@
+# backend/app/result_cache.py
+#
+# Cache of executed query results, keyed by canonicalized SQL text.
+# Each entry remembers the data generation (see data_version) it was computed
+# at and is discarded once load_data bumps the generation. Total size is kept
+# under RESULT_CACHE_BYTES with LRU eviction.
+
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+
+RESULT_CACHE_BYTES = int(os.getenv("RESULT_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+
+
+def canonicalize_sql(sql):
+    """Collapse whitespace and case outside string literals, drop trailing ';'"""
+    parts = []
+    last = 0
+    for m in _STRING_RE.finditer(sql):
+        parts.append(re.sub(r"\s+", " ", sql[last:m.start()]).lower())
+        parts.append(m.group(0))
+        last = m.end()
+    parts.append(re.sub(r"\s+", " ", sql[last:]).lower())
+    return "".join(parts).strip().rstrip(";").strip()
+
+def estimate_size(columns, rows):
+    """Rough in-memory footprint of a result set in bytes"""
+    size = sys.getsizeof(rows) + sum(sys.getsizeof(c) for c in columns)
+    for row in rows:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row)
+    return size
+
+
+class ResultCache:
+    """Byte-budgeted LRU of query results (formatter.QueryResult) per canonical SQL"""
+
+    def __init__(self, max_bytes=RESULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, sql, generation):
+        """Cached QueryResult for this generation, else None"""
+        key = canonicalize_sql(sql)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] != generation:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, sql, generation, result):
+        size = estimate_size(result.columns, result.rows) + sys.getsizeof(result.stats)
+        if size > self.max_bytes:
+            return
+        key = canonicalize_sql(sql)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (generation, result, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
@@ -0,0 +1,289 @@
+# backend/app/retrieval.py
+#
+# Question-aware context for the NL→SQL prompt.
+#
+# Instead of the whole DATA_DICTIONARY and every table's columns, the SQL
+# prompt gets only what the question needs:
+# - tables: BM25 over one document per table (its name, dictionary entry,
+#   column names and the notes that mention it); tables scoring at least
+#   RETRIEVAL_TABLE_RATIO of the best are kept, up to RETRIEVAL_MAX_TABLES,
+#   plus any table the chosen examples query.
+# - columns: every column of the chosen tables by default. Questions often
+#   name a value rather than its column ("Jeans", "Brasil"), so pruning loses
+#   recall. With RETRIEVAL_FULL_COLUMNS=N, tables wider than N are cut to
+#   keys, names, timestamps and the columns whose words appear in the
+#   question. Dictionary entries drop their column lists either way, because
+#   the schema section already lists every column with its type.
+# - examples: the RETRIEVAL_EXAMPLES verified question→SQL pairs from
+#   EXAMPLES whose questions score best.
+# Dictionary lines are kept when they mention a selected table or no table
+# at all, so the notes and instructions stay in one place (llm_chain).
+# A question that matches nothing gets the full schema. SQL_RETRIEVAL=0
+# turns the stage off. `python -m app.bench_prompts` measures the effect.
+
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+SQL_RETRIEVAL = os.getenv("SQL_RETRIEVAL", "1") == "1"
+RETRIEVAL_MAX_TABLES = int(os.getenv("RETRIEVAL_MAX_TABLES", "3"))
+RETRIEVAL_TABLE_RATIO = float(os.getenv("RETRIEVAL_TABLE_RATIO", "0.5"))
+RETRIEVAL_EXAMPLES = int(os.getenv("RETRIEVAL_EXAMPLES", "3"))
+RETRIEVAL_FULL_COLUMNS = int(os.getenv("RETRIEVAL_FULL_COLUMNS", "0"))  # 0 = never prune
+
+# Verified question→SQL pairs (each runs against the catalog; see
+# bench_prompts --verify). Aggregates prefer the rollup tables, as the
+# dictionary asks.
+EXAMPLES = [
+    ("How many orders are in each status?",
+     "SELECT status, order_count FROM order_status_counts ORDER BY order_count DESC"),
+    ("How many orders have been returned?",
+     "SELECT order_count FROM order_status_counts WHERE status = 'Returned'"),
+    ("How many orders were placed each month in 2023?",
+     "SELECT strftime('%Y-%m', created_at) AS month, COUNT(*) AS orders FROM orders "
+     "WHERE created_at >= '2023-01-01' AND created_at < '2024-01-01' GROUP BY month ORDER BY month"),
+    ("What is the average number of items per order?",
+     "SELECT AVG(num_of_item) AS avg_items FROM orders"),
+    ("Which customers placed the most orders?",
+     "SELECT u.first_name, u.last_name, COUNT(*) AS orders FROM orders o "
+     "JOIN users u ON u.id = o.user_id GROUP BY u.id ORDER BY orders DESC LIMIT 10"),
+    ("What are the top 5 best-selling products?",
+     "SELECT product_name, SUM(items_sold) AS items_sold FROM daily_product_sales "
+     "GROUP BY product_id, product_name ORDER BY items_sold DESC LIMIT 5"),
+    ("What was the total revenue last month?",
+     "SELECT SUM(revenue) AS revenue FROM daily_category_sales "
+     "WHERE day >= date('now', 'start of month', '-1 month') AND day < date('now', 'start of month')"),
+    ("What is the revenue per category?",
+     "SELECT category, SUM(revenue) AS revenue FROM daily_category_sales "
+     "GROUP BY category ORDER BY revenue DESC"),
+    ("Which brands have the most returned items?",
+     "SELECT brand, SUM(items_returned) AS returned FROM daily_product_sales "
+     "GROUP BY brand ORDER BY returned DESC LIMIT 10"),
+    ("How did daily sales of the Women department change this week?",
+     "SELECT day, SUM(items_sold) AS items_sold FROM daily_category_sales "
+     "WHERE department = 'Women' AND day >= date('now', '-7 days') GROUP BY day ORDER BY day"),
+    ("What are the 10 most expensive products?",
+     "SELECT name, brand, retail_price FROM products ORDER BY retail_price DESC LIMIT 10"),
+    ("What is the average margin per category?",
+     "SELECT category, AVG(retail_price - cost) AS avg_margin FROM products "
+     "GROUP BY category ORDER BY avg_margin DESC"),
+    ("How many products does each brand sell?",
+     "SELECT brand, COUNT(*) AS products FROM products GROUP BY brand ORDER BY products DESC"),
+    ("How many items are in stock at each distribution center?",
+     "SELECT dc.name, SUM(i.in_stock_items) AS in_stock FROM inventory_by_distribution_center i "
+     "JOIN distribution_centers dc ON dc.id = i.distribution_center_id "
+     "GROUP BY dc.name ORDER BY in_stock DESC"),
+    ("What is the cost of unsold inventory per category?",
+     "SELECT product_category, SUM(in_stock_cost) AS stock_cost FROM inventory_by_distribution_center "
+     "GROUP BY product_category ORDER BY stock_cost DESC"),
+    ("Which inventory items of a product were sold?",
+     "SELECT id, product_name, sold_at FROM inventory_items "
+     "WHERE product_id = 1 AND sold_at IS NOT NULL ORDER BY sold_at"),
+    ("Where are the distribution centers located?",
+     "SELECT name, latitude, longitude FROM distribution_centers ORDER BY name"),
+    ("How many users came from each traffic source?",
+     "SELECT traffic_source, COUNT(*) AS users FROM users GROUP BY traffic_source ORDER BY users DESC"),
+    ("Which countries have the most customers?",
+     "SELECT country, COUNT(*) AS users FROM users GROUP BY country ORDER BY users DESC LIMIT 10"),
+    ("What is the average age of users by gender?",
+     "SELECT gender, AVG(age) AS avg_age FROM users GROUP BY gender"),
+    ("How long does shipping take on average?",
+     "SELECT AVG(julianday(delivered_at) - julianday(shipped_at)) AS days FROM order_items "
+     "WHERE delivered_at IS NOT NULL AND shipped_at IS NOT NULL"),
+    ("Which items are in order 42?",
+     "SELECT p.name, oi.status FROM order_items oi JOIN products p ON p.id = oi.product_id "
+     "WHERE oi.order_id = 42"),
+]
+
+_STOPWORDS = set("""
+a an and are as at be by do does for from had has have how i in is it its me
+my of on or our per show tell that the their them there these this to us was
+we were what when where which who why with you your give list get all each
+""".split())
+# question words -> words the schema uses for them
+_SYNONYMS = {
+    "customer": ["user"], "client": ["user"], "buyer": ["user"],
+    "stock": ["inventory", "sold"], "warehouse": ["distribution", "center"],
+    "revenue": ["sale", "retail", "price"], "sale": ["sold", "revenue"],
+    "sell": ["sold", "sale"], "sold": ["sale"], "seller": ["sold", "sale"],
+    "bought": ["order"], "purchase": ["order"], "return": ["returned"],
+    "returned": ["return"], "profit": ["margin", "cost", "retail"],
+    "margin": ["cost", "retail", "price"], "expensive": ["price"], "cheap": ["price"],
+    "count": ["number"], "shipping": ["shipped", "delivered"], "location": ["latitude"],
+    "located": ["latitude", "city"],
+}
+# words that make a question about time; they match the timestamp columns
+_TIME_WORDS = set("""
+year month week day daily today yesterday date when recent recently last since
+trend time weekly monthly yearly quarter
+""".split())
+_TIME_TOKEN = "_time"
+_WORD = re.compile(r"[a-z0-9]+")
+_YEAR = re.compile(r"^(19|20)\d\d$")
+_TABLE_REF = re.compile(r"\b(?:from|join)\s+([a-z_]+)", re.IGNORECASE)
+_ENTRY = re.compile(r"^\d+\.\s+(\w+):\s+\[([^\]]*)\](.*)$")
+
+
+def _stem(word):
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def tokenize(text, expand=False):
+    """Lowercased, stemmed words; with expand, plus synonyms and _time"""
+    tokens = []
+    for word in _WORD.findall(text.lower().replace("_", " ")):
+        if word in _STOPWORDS:
+            continue
+        word = _stem(word)
+        tokens.append(word)
+        if expand:
+            tokens.extend(_SYNONYMS.get(word, ()))
+            if word in _TIME_WORDS or _YEAR.match(word):
+                tokens.append(_TIME_TOKEN)
+    return tokens
+
+def _column_tokens(name):
+    tokens = set(tokenize(name))
+    if name.endswith("_at") or name in ("day", "date"):
+        tokens.add(_TIME_TOKEN)
+    return tokens
+
+
+class BM25:
+    """Okapi BM25 over pre-tokenized documents"""
+
+    def __init__(self, documents, k1=1.2, b=0.75):
+        self.k1, self.b = k1, b
+        self.docs = [Counter(doc) for doc in documents]
+        self.lengths = [len(doc) for doc in documents]
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0
+        df = Counter(term for doc in self.docs for term in doc)
+        n = len(self.docs)
+        self.idf = {term: math.log(1 + (n - f + 0.5) / (f + 0.5)) for term, f in df.items()}
+
+    def scores(self, query):
+        out = []
+        for doc, length in zip(self.docs, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / (self.avg_length or 1))
+            score = 0.0
+            for term in query:
+                tf = doc.get(term)
+                if tf:
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            out.append(score)
+        return out
+
+    def top(self, query, k):
+        """[(index, score)] of the k best documents scoring above zero"""
+        ranked = sorted(enumerate(self.scores(query)), key=lambda p: -p[1])
+        return [(i, s) for i, s in ranked[:k] if s > 0]
+
+
+class SchemaIndex:
+    """Retrieval index over one schema (introspected columns) and dictionary"""
+
+    def __init__(self, columns, dictionary, examples=EXAMPLES):
+        self.columns = columns
+        self.tables = list(columns)
+        self.examples = examples
+        mention = {t: re.compile(rf"\b{re.escape(t)}\b") for t in self.tables}
+        # dictionary lines with the tables each one is about
+        self.lines = []
+        for line in dictionary.strip("\n").splitlines():
+            entry = _ENTRY.match(line.strip())
+            if entry and entry.group(1) in mention:
+                self.lines.append((line, {entry.group(1)}, entry))
+            else:
+                self.lines.append((line, {t for t, rx in mention.items() if rx.search(line)}, None))
+        table_docs = []
+        for table in self.tables:
+            # the table's own name words weigh like its columns together
+            name = tokenize(table) * 3
+            cols = [tok for col, _ in columns[table] for tok in _column_tokens(col)]
+            notes = [tok for line, tables, _ in self.lines if table in tables
+                     for tok in tokenize(line)]
+            table_docs.append(name + cols + notes)
+        self.table_index = BM25(table_docs)
+        self.example_index = BM25([tokenize(q, expand=True) for q, _ in examples])
+
+    def select(self, question):
+        """(tables, {table: columns}, examples) for a question; None = no match"""
+        message = question.rsplit("Current message:", 1)[-1]
+        # the current message counts twice as much as the history around it
+        query = tokenize(question, expand=True) + tokenize(message, expand=True)
+        ranked = self.table_index.top(query, len(self.tables))
+        if not ranked:
+            return None
+        best = ranked[0][1]
+        chosen = {self.tables[i] for i, s in ranked[:RETRIEVAL_MAX_TABLES]
+                  if s >= best * RETRIEVAL_TABLE_RATIO}
+        examples = [self.examples[i] for i, _ in
+                    self.example_index.top(query, RETRIEVAL_EXAMPLES)]
+        for _, sql in examples:
+            chosen.update(t.lower() for t in _TABLE_REF.findall(sql) if t.lower() in self.columns)
+        tables = [t for t in self.tables if t in chosen]
+        wanted = set(query)
+        return tables, {t: self._columns(t, wanted) for t in tables}, examples
+
+    def _columns(self, table, wanted):
+        cols = self.columns[table]
+        if not RETRIEVAL_FULL_COLUMNS or len(cols) <= RETRIEVAL_FULL_COLUMNS:
+            return cols
+        keep = []
+        for name, type_ in cols:
+            tokens = _column_tokens(name)
+            if (name in ("id", "name", "day", "status", "created_at") or name.endswith("_id")
+                    or tokens & wanted):
+                keep.append((name, type_))
+        return keep
+
+    def render_dictionary(self, tables):
+        """DATA_DICTIONARY cut down to the selected tables, without the column
+        lists the schema section repeats"""
+        selected = set(tables)
+        out, heading, body, number = [], None, [], 0
+
+        def close():
+            # a heading is only worth keeping when some of its lines are
+            if heading is None or any(line.strip() for line in body):
+                out.extend(([heading] if heading is not None else []) + body)
+
+        for line, about, entry in self.lines:
+            if line.rstrip().endswith(":") and not line.lstrip().startswith("-"):
+                close()
+                heading, body = line, []
+                continue
+            if about and not about & selected:
+                continue
+            if entry is not None:
+                number += 1
+                line = f"{number}. {entry.group(1)}{entry.group(3)}"
+            body.append(line)
+        close()
+        # collapse the blank lines left by dropped sections
+        return re.sub(r"\n{3,}", "\n\n", "\n".join(out)).strip("\n")
+
+
+def render_examples(examples):
+    """Prompt section for the chosen examples ("" when there are none)"""
+    if not examples:
+        return ""
+    pairs = "\n\n".join(f"Q: {q}\nSQL: {sql}" for q, sql in examples)
+    return f"Examples of correct queries:\n{pairs}\n\n"
+
+
+_lock = threading.Lock()
+_index = {"key": None, "index": None}
+
+def get_index(columns, dictionary, fingerprint):
+    """SchemaIndex for this schema, rebuilt when its fingerprint changes"""
+    with _lock:
+        if _index["key"] != fingerprint:
+            _index["index"] = SchemaIndex(columns, dictionary)
+            _index["key"] = fingerprint
+        return _index["index"]
@@ -0,0 +1,131 @@
+# backend/app/rollups.py
+#
+# Precomputed summary tables for the common commerce aggregates, so generated
+# SQL can answer "sales by category", "stock per distribution center", ...
+# from tables thousands of times smaller than order_items/inventory_items.
+#
+#   daily_product_sales / daily_category_sales  — keyed by day, refreshed
+#       only for the days touched by a load (all days if products changed)
+#   inventory_by_distribution_center            — refreshed only for the
+#       distribution centers touched by a load
+#   order_status_counts                         — tiny, recomputed in full
+#
+# load_data calls refresh() in its own transaction after the base tables are
+# loaded; `python -m app.rollups` rebuilds everything.
+
+import time
+from sqlalchemy import text
+from . import data_version
+
+KEY_BATCH = 500
+
+DAILY_PRODUCT_SALES = """
+INSERT INTO daily_product_sales
+    (day, product_id, product_name, category, brand, department,
+     items_sold, items_returned, revenue)
+SELECT date(oi.created_at), oi.product_id, p.name, p.category, p.brand, p.department,
+       COUNT(*),
+       SUM(CASE WHEN oi.returned_at IS NOT NULL OR oi.status = 'Returned' THEN 1 ELSE 0 END),
+       COALESCE(SUM(p.retail_price), 0)
+FROM order_items oi
+LEFT JOIN products p ON p.id = oi.product_id
+WHERE oi.created_at IS NOT NULL AND oi.product_id IS NOT NULL {where}
+GROUP BY date(oi.created_at), oi.product_id
+"""
+
+DAILY_CATEGORY_SALES = """
+INSERT INTO daily_category_sales
+    (day, category, department, items_sold, items_returned, revenue)
+SELECT day, COALESCE(category, 'Unknown'), COALESCE(department, 'Unknown'),
+       SUM(items_sold), SUM(items_returned), SUM(revenue)
+FROM daily_product_sales
+WHERE 1 = 1 {where}
+GROUP BY day, COALESCE(category, 'Unknown'), COALESCE(department, 'Unknown')
+"""
+
+INVENTORY_BY_DC = """
+INSERT INTO inventory_by_distribution_center
+    (distribution_center_id, product_category, total_items,
+     in_stock_items, sold_items, in_stock_cost)
+SELECT COALESCE(product_distribution_center_id, 0), COALESCE(product_category, 'Unknown'),
+       COUNT(*),
+       SUM(CASE WHEN sold_at IS NULL THEN 1 ELSE 0 END),
+       SUM(CASE WHEN sold_at IS NOT NULL THEN 1 ELSE 0 END),
+       COALESCE(SUM(CASE WHEN sold_at IS NULL THEN cost END), 0)
+FROM inventory_items
+WHERE 1 = 1 {where}
+GROUP BY COALESCE(product_distribution_center_id, 0), COALESCE(product_category, 'Unknown')
+"""
+
+ORDER_STATUS_COUNTS = """
+INSERT INTO order_status_counts (status, order_count)
+SELECT COALESCE(status, 'Unknown'), COUNT(*) FROM orders GROUP BY COALESCE(status, 'Unknown')
+"""
+
+
+def _batches(keys):
+    keys = sorted(keys)
+    for i in range(0, len(keys), KEY_BATCH):
+        yield keys[i:i + KEY_BATCH]
+
+def _refresh_keyed(conn, table, key_col, insert_sql, source_expr, keys):
+    """Delete and recompute rows of `table` for `keys` (None = everything)"""
+    if keys is None:
+        conn.execute(text(f"DELETE FROM {table}"))
+        conn.execute(text(insert_sql.format(where="")))
+        return
+    for batch in _batches(keys):
+        params = {f"k{i}": k for i, k in enumerate(batch)}
+        in_list = ", ".join(f":k{i}" for i in range(len(batch)))
+        conn.execute(text(f"DELETE FROM {table} WHERE {key_col} IN ({in_list})"), params)
+        conn.execute(text(insert_sql.format(where=f"AND {source_expr} IN ({in_list})")), params)
+
+def refresh(conn, changes):
+    """Bring the rollups up to date for a load.
+
+    `changes` maps a base table name to the set of affected keys, or to None
+    when every key may have changed. Recognised keys: order_items → days
+    ('YYYY-MM-DD'), inventory_items → distribution center ids; products and
+    orders are handled as full refreshes of the rollups that depend on them.
+    """
+    refreshed = []
+    if 'products' in changes:
+        days = None
+    elif 'order_items' in changes:
+        days = changes['order_items']
+    else:
+        days = set()
+    if days is None or days:
+        _refresh_keyed(conn, 'daily_product_sales', 'day', DAILY_PRODUCT_SALES,
+                       'date(oi.created_at)', days)
+        _refresh_keyed(conn, 'daily_category_sales', 'day', DAILY_CATEGORY_SALES,
+                       'day', days)
+        refreshed += ['daily_product_sales', 'daily_category_sales']
+
+    if 'inventory_items' in changes:
+        dcs = changes['inventory_items']
+        _refresh_keyed(conn, 'inventory_by_distribution_center', 'distribution_center_id',
+                       INVENTORY_BY_DC, 'COALESCE(product_distribution_center_id, 0)', dcs)
+        refreshed.append('inventory_by_distribution_center')
+
+    if 'orders' in changes:
+        conn.execute(text("DELETE FROM order_status_counts"))
+        conn.execute(text(ORDER_STATUS_COUNTS))
+        refreshed.append('order_status_counts')
+
+    if refreshed:
+        data_version.bump(conn, refreshed)
+    return refreshed
+
+def rebuild_all(engine):
+    changes = {'products': None, 'order_items': None, 'inventory_items': None, 'orders': None}
+    with engine.begin() as conn:
+        return refresh(conn, changes)
+
+if __name__ == '__main__':
+    from .database import Base, engine
+
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    tables = rebuild_all(engine)
+    print(f"✅ Rebuilt {', '.join(tables)} in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,98 @@
+# backend/app/schema_info.py
+#
+# Rendered schema text for the NL→SQL prompt, built once and cached.
+# The cache is keyed on SQLite's `PRAGMA schema_version` (bumped by any DDL),
+# which is checked at most every SCHEMA_CHECK_SECONDS; init_db and load_data
+# call invalidate() explicitly. Only the analytical tables are rendered —
+# the chat tables (conversations, messages, ...) are never shown to the LLM.
+
+import hashlib
+import os
+import threading
+import time
+from sqlalchemy import inspect, text
+
+ANALYTICS_TABLES = [
+    t.strip() for t in os.getenv(
+        "SCHEMA_TABLES",
+        "distribution_centers,products,inventory_items,orders,order_items,users,"
+        "daily_product_sales,daily_category_sales,inventory_by_distribution_center,"
+        "order_status_counts",
+    ).split(",") if t.strip()
+]
+SCHEMA_CHECK_SECONDS = float(os.getenv("SCHEMA_CHECK_SECONDS", "60"))
+
+_lock = threading.Lock()
+_cache = {"version": None, "text": None, "columns": None, "fingerprint": None,
+          "checked_at": 0.0}
+
+
+def _schema_version(engine):
+    """Cheap DDL counter; None on backends without one"""
+    if engine.dialect.name != "sqlite":
+        return None
+    with engine.connect() as conn:
+        return conn.execute(text("PRAGMA schema_version")).scalar()
+
+def introspect(engine, tables=None):
+    """{table: [(column, type), ...]} for the allow-listed tables that exist"""
+    tables = ANALYTICS_TABLES if tables is None else tables
+    inspector = inspect(engine)
+    existing = set(inspector.get_table_names())
+    return {
+        table_name: [(col["name"], str(col["type"])) for col in inspector.get_columns(table_name)]
+        for table_name in tables if table_name in existing
+    }
+
+def render_columns(columns):
+    """`Table: ...\\nColumns: ...` blocks for an introspect()-shaped dict"""
+    table_info = []
+    for table_name, cols in columns.items():
+        column_info = ", ".join(f"{name} ({type_})" for name, type_ in cols)
+        table_info.append(f"Table: {table_name}\nColumns: {column_info}")
+    return "\n\n".join(table_info)
+
+def render_table_info(engine, tables=None):
+    """Introspect the catalog and render `Table: ...\\nColumns: ...` blocks"""
+    return render_columns(introspect(engine, tables))
+
+def _stale(now):
+    return _cache["text"] is None or now - _cache["checked_at"] >= SCHEMA_CHECK_SECONDS
+
+def _refresh(engine):
+    now = time.monotonic()
+    if not _stale(now):
+        return
+    with _lock:
+        if not _stale(now):
+            return
+        version = _schema_version(engine)
+        if _cache["text"] is None or version is None or version != _cache["version"]:
+            columns = introspect(engine)
+            rendered = render_columns(columns)
+            _cache["columns"] = columns
+            _cache["text"] = rendered
+            _cache["fingerprint"] = hashlib.sha1(rendered.encode()).hexdigest()[:12]
+            _cache["version"] = version
+        _cache["checked_at"] = now
+
+def get_table_info(engine):
+    """Cached schema text for the allow-listed tables"""
+    _refresh(engine)
+    return _cache["text"]
+
+def get_columns(engine):
+    """Cached introspect() result the schema text was rendered from"""
+    _refresh(engine)
+    return _cache["columns"]
+
+def schema_fingerprint(engine):
+    """Short hash of the rendered schema; changes whenever the prompt would"""
+    _refresh(engine)
+    return _cache["fingerprint"]
+
+def invalidate():
+    """Force a rebuild on next use (called after init_db / load_data)"""
+    with _lock:
+        _cache["text"] = None
+        _cache["checked_at"] = 0.0
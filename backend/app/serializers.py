@@ -0,0 +1,88 @@
+# backend/app/serializers.py
+#
+# Fast JSON for the catalog list endpoints.
+#
+# For each marshmallow schema a row encoder is generated once per process: a
+# plain function, compiled from source, that turns a Core result tuple (the
+# schema's fields in declaration order) into exactly the dict schema.dump()
+# would give — ISO datetimes, nulls kept, keys sorted like Flask's jsonify.
+# No ORM objects are hydrated and no field dispatch happens per row. Bodies
+# are encoded with orjson when it is installed, json otherwise (the bytes
+# differ only in how non-ASCII text is escaped). orjson is optional and not a
+# declared dependency, like duckdb and brotli:
+#
+#   pip install orjson
+
+import datetime
+import json
+from functools import lru_cache
+from marshmallow import fields
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# checked in order: subclasses first (Date is a DateTime, Email a String)
+_CONVERTERS = [
+    (fields.Date, "_iso_date"),
+    (fields.DateTime, "_iso"),
+    (fields.Float, "float"),
+    (fields.Integer, "int"),
+    (fields.Boolean, "bool"),
+    (fields.String, "str"),
+]
+_NAMESPACE = {
+    "_iso": datetime.datetime.isoformat,
+    "_iso_date": datetime.date.isoformat,
+}
+
+
+def _converter(field):
+    for field_type, name in _CONVERTERS:
+        if isinstance(field, field_type):
+            if isinstance(field, fields.DateTime) and field.format not in (None, "iso", "iso8601"):
+                break
+            return name
+    raise TypeError(f"no fast encoder for {type(field).__name__} fields")
+
+def dumps(obj):
+    """JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+class RowEncoder:
+    """Generated tuple -> dict encoder for one schema/model pair"""
+
+    def __init__(self, Schema, Model):
+        schema = Schema()
+        self.names = [name for name, f in schema.fields.items() if not f.load_only]
+        self.columns = [getattr(Model, f.attribute or name)
+                        for name, f in schema.fields.items() if not f.load_only]
+        items = []
+        for i, name in enumerate(self.names):
+            conv = _converter(schema.fields[name])
+            items.append((schema.fields[name].data_key or name,
+                          f"None if v{i} is None else {conv}(v{i})"))
+        unpack = ", ".join(f"v{i}" for i in range(len(self.names)))
+        body = ", ".join(f"{key!r}: {expr}" for key, expr in sorted(items))
+        self.source = f"def encode(row):\n    {unpack}, = row\n    return {{{body}}}\n"
+        namespace = dict(_NAMESPACE)
+        exec(compile(self.source, f"<encoder {Schema.__name__}>", "exec"), namespace)
+        self.encode = namespace["encode"]
+
+    def dumps(self, rows):
+        """JSON array body for a list of rows"""
+        encode = self.encode
+        return dumps([encode(row) for row in rows])
+
+    def dumps_line(self, row):
+        """One NDJSON line"""
+        return dumps(self.encode(row)) + b"\n"
+
+
+@lru_cache(maxsize=None)
+def row_encoder(Schema, Model):
+    return RowEncoder(Schema, Model)
@@ -0,0 +1,254 @@
+# backend/app/sql_cache.py
+#
+# Question → SQL cache in front of the SQL-generation LLM call.
+#
+# Questions are normalized (case, whitespace, trailing punctuation) and their
+# literals (numbers, quoted strings) are lifted out as placeholders, so
+# "status of order 1234" and "status of order 987" share one entry whose SQL
+# is stored as a template ("... WHERE order_id = {p0}"). A value is only
+# templated when it is the statement's sole literal of its kind (one number,
+# or one string), so values the LLM derived from it — the year after, the
+# end of a date range — can never be left behind; otherwise its concrete
+# value is pinned in the entry and any other value is a miss.
+#
+# In-memory LRU with TTL, optionally backed by a SQLite file (SQL_CACHE_PATH)
+# so entries survive restarts and are shared between worker processes.
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+SQL_CACHE_SIZE = int(os.getenv("SQL_CACHE_SIZE", "1024"))
+SQL_CACHE_TTL = float(os.getenv("SQL_CACHE_TTL", "86400"))
+SQL_CACHE_PATH = os.getenv("SQL_CACHE_PATH", "")
+
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|(?<![\w.])\d+(?:\.\d+)?(?![\w.])")
+NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+def _kind(value):
+    return "number" if NUMBER_RE.fullmatch(value) else "string"
+
+def normalize_question(question):
+    """Return (template, values): lowercased text with literals as <nN>/<sN>"""
+    values = []
+    parts = []
+    last = 0
+    for m in LITERAL_RE.finditer(question):
+        parts.append(question[last:m.start()].lower())
+        value = m.group(0)
+        if value[0] in "'\"":
+            value = value[1:-1].replace(value[0] * 2, value[0])
+        if value not in values:
+            values.append(value)
+        # numbers and strings never share a template: a number slot is unquoted
+        parts.append(f"<{_kind(value)[0]}{values.index(value)}>")
+        last = m.end()
+    parts.append(question[last:].lower())
+    template = re.sub(r"\s+", " ", "".join(parts)).strip().rstrip("?.! ")
+    return template, values
+
+def sql_literals(sql):
+    """[(start, end, kind, value)] for the SQL's value literals.
+
+    'It''s' is one string (unescaped to It's); "quoted" identifiers are
+    skipped, and so are digits inside them or inside other names.
+    """
+    literals = []
+    for m in LITERAL_RE.finditer(sql):
+        token = m.group(0)
+        if token[0] == '"':
+            continue
+        if token[0] == "'":
+            literals.append((m.start(), m.end(), "string", token[1:-1].replace("''", "'")))
+        else:
+            literals.append((m.start(), m.end(), "number", token))
+    return literals
+
+def _placeholder(kind, literal, value, i):
+    """Template text for `literal` standing in for `value`, or None"""
+    if kind == "number":
+        return f"{{p{i}}}" if float(literal) == float(value) else None
+    # a plain string, or a LIKE pattern around it ('%x%')
+    inner = literal.strip("%")
+    if inner != value:
+        return None
+    prefix = literal[:len(literal) - len(literal.lstrip("%"))]
+    suffix = literal[len(literal.rstrip("%")):]
+    return f"'{prefix}{{p{i}}}{suffix}'"
+
+def _escape_braces(text):
+    return text.replace("{", "{{").replace("}", "}}")
+
+def templatize_sql(sql, values):
+    """Template each value that is the sole literal of its kind; pin the rest.
+
+    Returns (template, fixed) where fixed maps value index -> the value a
+    question must repeat for the entry to apply.
+    """
+    literals = sql_literals(sql)
+    by_kind = {}
+    for literal in literals:
+        by_kind.setdefault(literal[2], []).append(literal)
+    # years and counts are routinely turned into date strings ('2023-01-01')
+    dated = any(re.search(r"\d", v) for _, _, kind, v in literals if kind == "string")
+    replacements = []
+    fixed = {}
+    for i, value in enumerate(values):
+        kind = _kind(value)
+        same_kind = by_kind.get(kind, [])
+        text = None
+        if len(same_kind) == 1 and not (kind == "number" and dated):
+            start, end, _, literal = same_kind[0]
+            text = _placeholder(kind, literal, value, i)
+        if text is None:
+            fixed[str(i)] = value
+        else:
+            replacements.append((start, end, text))
+            by_kind[kind] = []  # one value per literal
+    parts, last = [], 0
+    for start, end, text in sorted(replacements):
+        parts.append(_escape_braces(sql[last:start]))
+        parts.append(text)
+        last = end
+    parts.append(_escape_braces(sql[last:]))
+    return "".join(parts), fixed
+
+def render_sql(template, values):
+    return template.format(**{f"p{i}": v.replace("'", "''") for i, v in enumerate(values)})
+
+
+class SQLCache:
+    """LRU + TTL question→SQL cache with an optional shared SQLite backing"""
+
+    def __init__(self, max_entries=SQL_CACHE_SIZE, ttl=SQL_CACHE_TTL, path=SQL_CACHE_PATH):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path or None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+        if self.path:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS sql_cache ("
+                    " key TEXT PRIMARY KEY, sql TEXT NOT NULL,"
+                    " fixed TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _key(template, schema_version):
+        return f"{schema_version}:{template}"
+
+    def _load(self, key):
+        if not self.path:
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT sql, fixed, created_at FROM sql_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), row[2]
+
+    def _store(self, key, entry):
+        if not self.path:
+            return
+        sql, fixed, created_at = entry
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sql_cache VALUES (?, ?, ?, ?)",
+                (key, sql, json.dumps(fixed), created_at),
+            )
+            conn.execute(
+                "DELETE FROM sql_cache WHERE created_at < ? OR key NOT IN ("
+                " SELECT key FROM sql_cache ORDER BY created_at DESC LIMIT ?)",
+                (time.time() - self.ttl, self.max_entries),
+            )
+
+    def get(self, question, schema_version):
+        """Cached SQL for the question (literals substituted) or None"""
+        template, values = normalize_question(question)
+        key = self._key(template, schema_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            entry = self._load(key)
+        if entry is not None:
+            sql, fixed, created_at = entry
+            fresh = time.time() - created_at < self.ttl
+            matches = all(
+                int(i) < len(values) and values[int(i)] == v for i, v in fixed.items()
+            )
+            if fresh and matches:
+                with self._lock:
+                    self.hits += 1
+                    self._remember(key, entry)
+                return render_sql(sql, values)
+            if not fresh:
+                self.invalidate(key)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, question, schema_version, sql):
+        template, values = normalize_question(question)
+        key = self._key(template, schema_version)
+        sql_template, fixed = templatize_sql(sql, values)
+        entry = (sql_template, fixed, time.time())
+        with self._lock:
+            self._remember(key, entry)
+        self._store(key, entry)
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, question, schema_version):
+        """Drop the entry get()/put() use for this question"""
+        template, _ = normalize_question(question)
+        self.invalidate(self._key(template, schema_version))
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM sql_cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM sql_cache")
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,107 @@
+# backend/app/stub_llm.py
+#
+# Deterministic, offline stand-in for ChatGroq (LLM_PROVIDER=stub).
+#
+# SQL prompts are answered with a canned statement picked by keywords in the
+# user's current message; response prompts echo the first result line. The
+# same prompt always gives the same text. Latency is simulated:
+# STUB_LLM_LATENCY_MS before the first token, then STUB_LLM_TOKEN_MS per
+# token (streamed or not). Token usage is reported like a real provider.
+
+import os
+import re
+import time
+from typing import Any, Iterator, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+STUB_LLM_LATENCY_MS = float(os.getenv("STUB_LLM_LATENCY_MS", "200"))
+STUB_LLM_TOKEN_MS = float(os.getenv("STUB_LLM_TOKEN_MS", "5"))
+
+CANNED_SQL = [
+    (r"\b(?:list|all|every)\b",
+     "SELECT id, name, category, brand, retail_price FROM products ORDER BY id"),
+    (r"how many orders|number of orders",
+     "SELECT COUNT(*) AS orders FROM orders"),
+    (r"revenue|sales|sold",
+     "SELECT category, SUM(revenue) AS revenue FROM daily_category_sales "
+     "GROUP BY category ORDER BY revenue DESC"),
+    (r"stock|inventory",
+     "SELECT distribution_center_id, SUM(in_stock_items) AS in_stock "
+     "FROM inventory_by_distribution_center GROUP BY distribution_center_id"),
+    (r"user|customer",
+     "SELECT traffic_source, COUNT(*) AS users FROM users GROUP BY traffic_source"),
+    (r"product|price",
+     "SELECT name, retail_price FROM products ORDER BY retail_price DESC LIMIT 5"),
+]
+DEFAULT_SQL = "SELECT status, COUNT(*) AS orders FROM orders GROUP BY status"
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+def _current_message(prompt):
+    for marker in ("Current message:", "User Question:", "Question:"):
+        if marker in prompt:
+            return prompt.rsplit(marker, 1)[1].strip().splitlines()[0]
+    return prompt
+
+def reply_for(prompt):
+    """The deterministic completion for a rendered prompt"""
+    question = _current_message(prompt)
+    if prompt.rstrip().endswith("SQL Query:"):
+        for pattern, sql in CANNED_SQL:
+            if re.search(pattern, question, re.IGNORECASE):
+                return sql
+        return DEFAULT_SQL
+    results = prompt.rsplit("Query Results:", 1)[-1].split("Concise Response:")[0]
+    lines = [l for l in results.strip().splitlines() if l.strip() and not l.startswith("|---")]
+    first = lines[1] if len(lines) > 1 else (lines[0] if lines else "no rows")
+    return f"Concise Response: For “{question}”, the top result is {first.strip(' |')}."
+
+
+class StubChatModel(BaseChatModel):
+    """Offline chat model with fixed answers and simulated latency"""
+
+    latency_ms: float = STUB_LLM_LATENCY_MS
+    token_ms: float = STUB_LLM_TOKEN_MS
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _prompt(self, messages: List[BaseMessage]) -> str:
+        return "\n".join(str(m.content) for m in messages)
+
+    def _pieces(self, text):
+        return re.findall(r"\S+\s*", text)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        prompt = self._prompt(messages)
+        text = reply_for(prompt)
+        time.sleep((self.latency_ms + self.token_ms * len(self._pieces(text))) / 1000)
+        message = AIMessage(content=text, usage_metadata={
+            "input_tokens": estimate_tokens(prompt),
+            "output_tokens": estimate_tokens(text),
+            "total_tokens": estimate_tokens(prompt) + estimate_tokens(text),
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        prompt = self._prompt(messages)
+        text = reply_for(prompt)
+        time.sleep(self.latency_ms / 1000)
+        for piece in self._pieces(text):
+            time.sleep(self.token_ms / 1000)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata={
+            "input_tokens": estimate_tokens(prompt),
+            "output_tokens": estimate_tokens(text),
+            "total_tokens": estimate_tokens(prompt) + estimate_tokens(text),
+        }))
@@ -0,0 +1,131 @@
+# backend/app/tracing.py
+#
+# Per-request timing spans for the chat pipeline.
+#
+#   with tracing.trace("chat"):           # one per request
+#       with tracing.span("llm_sql"):     # one per stage
+#           ...
+#
+# Every span feeds the stage_duration_seconds{stage} histogram (and
+# errors{stage} when it raises). When the trace ends, one structured JSON line
+# with the total and per-stage milliseconds is logged on `app.trace` (TRACE_LOG=0
+# disables it). LLM-generated statements slower than SLOW_QUERY_MS are logged
+# on `app.slow_query` with their plan.
+
+import contextvars
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from . import metrics
+
+TRACE_LOG = os.getenv("TRACE_LOG", "1") == "1"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+
+trace_logger = logging.getLogger("app.trace")
+slow_logger = logging.getLogger("app.slow_query")
+
+_current = contextvars.ContextVar("trace", default=None)
+
+
+class Trace:
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.spans = []
+        self.started = time.perf_counter()
+
+    def annotate(self, **attrs):
+        self.attrs.update(attrs)
+
+    def as_dict(self):
+        return {
+            "trace": self.name,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            **self.attrs,
+            "spans": self.spans,
+        }
+
+
+def current():
+    return _current.get()
+
+def annotate(**attrs):
+    """Attach attributes to the current trace, if any"""
+    t = _current.get()
+    if t is not None:
+        t.annotate(**attrs)
+
+@contextmanager
+def trace(name, **attrs):
+    t = Trace(name, **attrs)
+    token = _current.set(t)
+    try:
+        yield t
+    finally:
+        _current.reset(token)
+        elapsed = time.perf_counter() - t.started
+        metrics.observe("request_duration_seconds", elapsed, trace=name)
+        if TRACE_LOG:
+            trace_logger.info(json.dumps(t.as_dict(), default=str))
+
+@contextmanager
+def span(stage):
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = type(e).__name__
+        metrics.incr("errors", stage=stage, type=error)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe("stage_duration_seconds", elapsed, stage=stage)
+        t = _current.get()
+        if t is not None:
+            entry = {"stage": stage, "ms": round(elapsed * 1000, 2)}
+            if error:
+                entry["error"] = error
+            t.spans.append(entry)
+
+def slow_query(sql, duration_ms, row_count, plan=None, engine="sqlite"):
+    """Log an LLM-generated statement that exceeded SLOW_QUERY_MS"""
+    metrics.observe("sql_duration_seconds", duration_ms / 1000, engine=engine)
+    if duration_ms < SLOW_QUERY_MS:
+        return
+    metrics.incr("slow_queries", engine=engine)
+    slow_logger.warning(json.dumps({
+        "sql": sql,
+        "duration_ms": round(duration_ms, 2),
+        "row_count": row_count,
+        "engine": engine,
+        "plan": plan or [],
+    }))
+
+
+def token_counter():
+    """LangChain callback handler counting LLM tokens into metrics"""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class TokenCounter(BaseCallbackHandler):
+        def on_llm_end(self, response, **kwargs):
+            usage = {}
+            for generations in response.generations:
+                for g in generations:
+                    meta = getattr(getattr(g, "message", None), "usage_metadata", None)
+                    if meta:
+                        usage = meta
+            if not usage and response.llm_output:
+                raw = response.llm_output.get("token_usage") or {}
+                usage = {"input_tokens": raw.get("prompt_tokens", 0),
+                         "output_tokens": raw.get("completion_tokens", 0)}
+            for kind in ("input", "output"):
+                if usage.get(f"{kind}_tokens"):
+                    metrics.incr("llm_tokens", usage[f"{kind}_tokens"], type=kind)
+
+        def on_llm_error(self, error, **kwargs):
+            metrics.incr("errors", stage="llm", type=type(error).__name__)
+
+    return TokenCounter()
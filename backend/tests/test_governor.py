@@ -0,0 +1,26 @@
+# backend/tests/test_governor.py
+from app.governor import ensure_limit
+
+
+def test_injects_limit_with_probe_row():
+    assert ensure_limit("SELECT * FROM orders", max_rows=100) == \
+        "SELECT * FROM orders LIMIT 101"
+
+def test_caps_large_limit():
+    assert ensure_limit("SELECT * FROM orders LIMIT 100000", max_rows=100) == \
+        "SELECT * FROM orders LIMIT 101"
+
+def test_keeps_small_limit():
+    sql = "SELECT * FROM orders LIMIT 10 OFFSET 5000"
+    assert ensure_limit(sql, max_rows=100) == sql
+
+def test_caps_count_in_offset_comma_form():
+    # SQLite's LIMIT offset, count: the second number is the row count
+    assert ensure_limit("SELECT * FROM order_items LIMIT 5, 100000", max_rows=100) == \
+        "SELECT * FROM order_items LIMIT 5, 101"
+    sql = "SELECT * FROM order_items LIMIT 5000, 10"
+    assert ensure_limit(sql, max_rows=100) == sql
+
+def test_limit_not_swallowed_by_trailing_comment():
+    assert ensure_limit("SELECT * FROM orders -- all of them", max_rows=100) == \
+        "SELECT * FROM orders LIMIT 101"
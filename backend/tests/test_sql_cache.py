@@ -0,0 +1,48 @@
+# backend/tests/test_sql_cache.py
+from app.sql_cache import SQLCache, normalize_question, sql_literals, templatize_sql
+
+YEAR_SQL = ("SELECT COUNT(*) FROM orders "
+            "WHERE created_at >= '2023-01-01' AND created_at < '2024-01-01'")
+
+
+def test_single_id_equality_is_templated():
+    cache = SQLCache()
+    cache.put("What is the status of order 1234?", "v1",
+              "SELECT status FROM orders WHERE order_id = 1234")
+    assert cache.get("What is the status of order 987?", "v1") == \
+        "SELECT status FROM orders WHERE order_id = 987"
+
+def test_derived_date_range_is_pinned():
+    template, fixed = templatize_sql(YEAR_SQL, ["2023"])
+    assert fixed == {"0": "2023"}
+    assert "{p0}" not in template
+
+    cache = SQLCache()
+    cache.put("How many orders were placed in 2023?", "v1", YEAR_SQL)
+    assert cache.get("How many orders were placed in 2021?", "v1") is None
+    assert cache.get("How many orders were placed in 2023?", "v1") == YEAR_SQL
+
+def test_repeated_number_is_pinned():
+    sql = "SELECT * FROM orders WHERE num_of_item BETWEEN 3 AND 3 + 2"
+    _, fixed = templatize_sql(sql, ["3"])
+    assert fixed == {"0": "3"}
+
+def test_escaped_quote_is_one_literal():
+    assert normalize_question("cheapest product from 'Levi''s'") == \
+        ("cheapest product from <s0>", ["Levi's"])
+    assert [lit[3] for lit in sql_literals("SELECT 1 WHERE brand = 'Levi''s'")] == \
+        ["1", "Levi's"]
+
+def test_escaped_quote_round_trip():
+    cache = SQLCache()
+    cache.put("cheapest product from 'Levi''s'", "v1",
+              "SELECT name FROM products WHERE brand = 'Levi''s' "
+              "ORDER BY retail_price LIMIT 1")
+    assert cache.get("cheapest product from 'O''Neill'", "v1") == (
+        "SELECT name FROM products WHERE brand = 'O''Neill' "
+        "ORDER BY retail_price LIMIT 1")
+
+def test_number_and_string_questions_do_not_share_an_entry():
+    cache = SQLCache()
+    cache.put("status of order 1234", "v1", "SELECT status FROM orders WHERE order_id = 1234")
+    assert cache.get("status of order '1 OR 1=1'", "v1") is None
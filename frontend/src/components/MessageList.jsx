@@ -9,7 +9,7 @@ const MessageList = () => {
   return (
     <div className="message-list">
       {messages.map((m, idx) => (
-        <div key={idx} className={`message ${m.sender}`}>
+        <div key={m.id ?? `pending-${idx}`} className={`message ${m.sender}`}>
           <div className="avatar">{m.sender === 'user' ? '🧑‍💻' : '🤖'}</div>
           <div className="message-body">
             <div className="content">{m.content}</div>
@@ -1,5 +1,27 @@
 // src/context/ChatContext.js
-import React, { createContext, useContext, useState, useEffect } from 'react';
+import React, { createContext, useContext, useState, useEffect, useRef } from 'react';
+
+const API = 'http://localhost:5000/api';
+const LONG_POLL_SECONDS = 25;
+
+const maxId = (rows) => rows.reduce((max, r) => (r.id > max ? r.id : max), 0);
+
+// Add server rows by id; a row matching an optimistic (id-less) message
+// replaces it instead of showing twice.
+const mergeMessages = (current, incoming) => {
+  const merged = [...current];
+  const seen = new Set(current.filter((m) => m.id).map((m) => m.id));
+  for (const msg of incoming) {
+    if (seen.has(msg.id)) continue;
+    seen.add(msg.id);
+    const pending = merged.findIndex(
+      (m) => !m.id && m.sender === msg.sender && m.content === msg.content
+    );
+    if (pending >= 0) merged[pending] = msg;
+    else merged.push(msg);
+  }
+  return merged;
+};
 
 export const ChatContext = createContext();
 
@@ -9,41 +31,75 @@ export const ChatProvider = ({ children }) => {
   const [conversationId, setConversationId] = useState(null);
   const [inputValue, setInputValue] = useState('');
   const [loading, setLoading] = useState(false);
+  const messagesRef = useRef(messages);
+  const conversationsRef = useRef(conversations);
+  messagesRef.current = messages;
+  conversationsRef.current = conversations;
 
   // Load conversation list on mount or when conversationId changes
   useEffect(() => {
     fetchConversations();
   }, [conversationId]);
 
+  // Long-poll the open conversation for messages past the newest one shown;
+  // the server answers as soon as one lands, so a refresh moves only new rows
+  useEffect(() => {
+    if (!conversationId) return undefined;
+    const controller = new AbortController();
+    const poll = async () => {
+      while (!controller.signal.aborted) {
+        try {
+          const afterId = maxId(messagesRef.current);
+          const res = await fetch(
+            `${API}/messages?conversation_id=${conversationId}&after_id=${afterId}&wait=${LONG_POLL_SECONDS}`,
+            { signal: controller.signal }
+          );
+          if (!res.ok) throw new Error('Failed to poll messages');
+          const rows = await res.json();
+          if (controller.signal.aborted) return;
+          if (rows.length) setMessages((m) => mergeMessages(m, rows));
+        } catch (err) {
+          if (controller.signal.aborted) return;
+          console.error(err);
+          await new Promise((resolve) => setTimeout(resolve, 5000));
+        }
+      }
+    };
+    poll();
+    return () => controller.abort();
+  }, [conversationId]);
+
+  // Only conversations newer than the newest one already listed
   const fetchConversations = async () => {
     try {
-      const res = await fetch('http://localhost:5000/api/conversations?user_id=1');
+      const afterId = maxId(conversationsRef.current);
+      const res = await fetch(`${API}/conversations?user_id=1&after_id=${afterId}`);
       if (!res.ok) throw new Error('Failed to fetch');
-      setConversations(await res.json());
+      const fresh = await res.json();
+      if (fresh.length) {
+        setConversations((c) => [...fresh, ...c.filter((x) => !fresh.some((f) => f.id === x.id))]);
+      }
     } catch (err) {
       console.error(err);
     }
   };
 
-  const loadConversation = async (cid) => {
+  // History arrives through the poll loop's first request (after_id=0)
+  const loadConversation = (cid) => {
+    if (cid === conversationId) return;
+    setMessages([]);
     setConversationId(cid);
-    try {
-      const res = await fetch(`http://localhost:5000/api/messages?conversation_id=${cid}`);
-      if (!res.ok) throw new Error('Failed to fetch messages');
-      setMessages(await res.json());
-    } catch (err) {
-      console.error(err);
-    }
   };
 
   const sendMessage = async () => {
     if (!inputValue.trim()) return;
     const userMsg = { sender: 'user', content: inputValue, timestamp: new Date().toISOString() };
+    const seenId = maxId(messagesRef.current);
     setMessages((m) => [...m, userMsg]);
     setLoading(true);
 
     try {
-      const res = await fetch('http://localhost:5000/api/chat', {
+      const res = await fetch(`${API}/chat`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
@@ -55,7 +111,12 @@ export const ChatProvider = ({ children }) => {
       const { ai_response, conversation_id } = await res.json();
       setConversationId(conversation_id);
       const botMsg = { sender: 'bot', content: ai_response, timestamp: new Date().toISOString() };
-      setMessages((m) => [...m, botMsg]);
+      // the poll loop may already have delivered the saved reply
+      setMessages((m) =>
+        m.some((x) => x.id > seenId && x.sender === 'bot' && x.content === ai_response)
+          ? m
+          : [...m, botMsg]
+      );
     } catch (err) {
       console.error(err);
     } finally {